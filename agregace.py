@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""modul pro předpočítané agregační tabulky.
+
+Agregace se deklarují v config.py datasetu, např.:
+
+    AGREGACE = {
+        "t_podle_nazvu": {
+            "dimenze": ["nazev"],
+            "miry": {"mer": ["sum", "avg"]},
+        },
+    }
+
+ImporterDat je po importu vytvoří nebo obnoví, VyberciDat
+pak dotazy typu group by nad hlavní tabulkou, které lze
+spočítat z agregace, přepíše na menší agregační tabulku.
+"""
+
+import json
+import functools
+
+import duckdb
+
+# statistiky ukládané v agregační tabulce pro jednotlivé funkce
+ULOZENE = {
+    "sum": ("sum",),
+    "min": ("min",),
+    "max": ("max",),
+    "count": ("count",),
+    "avg": ("sum", "count"),
+}
+
+# výpočet funkce nad hlavní tabulkou z uložených statistik
+PREPISY = {
+    "sum": "sum(sum_{mira})",
+    "min": "min(min_{mira})",
+    "max": "max(max_{mira})",
+    "count": "coalesce(sum(count_{mira}), 0)::bigint",
+    "avg": "sum(sum_{mira})::double / nullif(sum(count_{mira}), 0)",
+}
+PREPIS_POCTU = "coalesce(sum(pocet), 0)::bigint"
+
+# výrazy, které nelze z agregace spočítat
+NEPODPOROVANE = ("SUBQUERY", "WINDOW", "STAR", "LAMBDA", "PARAMETER")
+
+
+class NelzePrepsat(Exception):
+    """dotaz nelze spočítat z agregační tabulky"""
+
+
+def sloupce_agregace(definice: dict) -> dict:
+    """vrátí sloupce agregační tabulky (název -> výraz)"""
+    sloupce = {dimenze: dimenze for dimenze in definice.get("dimenze", [])}
+    for mira, funkce in definice.get("miry", {}).items():
+        for nazev in funkce:
+            if nazev not in ULOZENE:
+                raise ValueError(f"Nepodporovaná agregační funkce: '{nazev}'")
+            for statistika in ULOZENE[nazev]:
+                sloupce[f"{statistika}_{mira}"] = f"{statistika}({mira})"
+    sloupce["pocet"] = "count(*)"
+    return sloupce
+
+
+def vyber_agregace(zdroj: str, definice: dict) -> str:
+    """sestaví select, který spočítá agregaci ze zdroje
+    (tabulky nebo poddotazu)"""
+    sloupce = ", ".join(
+        f"{vyraz} as {nazev}" for nazev, vyraz in sloupce_agregace(definice).items()
+    )
+    return f"select {sloupce} from {zdroj} group by all"
+
+
+def _strom(pripojeni, dotaz: str):
+    """vrátí syntaktický strom dotazu od duckdb, nebo None"""
+    strom = json.loads(
+        pripojeni.execute("select json_serialize_sql(?)", [dotaz]).fetchone()[0]
+    )
+    if strom["error"] or len(strom["statements"]) != 1:
+        return None
+    return strom
+
+
+@functools.cache
+def _agregacni_funkce():
+    """názvy všech agregačních funkcí duckdb"""
+    with duckdb.connect() as pripojeni:
+        return frozenset(
+            nazev
+            for (nazev,) in pripojeni.execute(
+                "select distinct function_name from duckdb_functions() "
+                "where function_type = 'aggregate'"
+            ).fetchall()
+        )
+
+
+@functools.cache
+def _vyraz(vyraz: str) -> str:
+    """syntaktický strom jednoho výrazu (jako json)"""
+    with duckdb.connect() as pripojeni:
+        strom = _strom(pripojeni, f"select {vyraz}")
+    return json.dumps(strom["statements"][0]["node"]["select_list"][0])
+
+
+class _Prepis:
+    """přepíše výrazy dotazu na sloupce jedné agregační tabulky"""
+
+    def __init__(self, definice, povolene, kvalifikatory):
+        self.ulozene = set(sloupce_agregace(definice))
+        self.povolene = povolene
+        self.kvalifikatory = kvalifikatory
+        self.agregacni = _agregacni_funkce()
+        self.pocet_agregaci = 0
+
+    def sloupec(self, uzel) -> str:
+        """název sloupce bez kvalifikace tabulkou"""
+        nazvy = uzel["column_names"]
+        if len(nazvy) == 2 and nazvy[0].lower() in self.kvalifikatory:
+            nazvy = nazvy[1:]
+        if len(nazvy) != 1:
+            raise NelzePrepsat(".".join(nazvy))
+        return nazvy[0]
+
+    def agregace(self, uzel):
+        """nahradí agregační funkci výpočtem z uložených statistik"""
+        nazev = uzel["function_name"].lower()
+        if uzel["distinct"] or uzel["filter"] or uzel["order_bys"]["orders"]:
+            raise NelzePrepsat(nazev)
+        if nazev == "count_star":
+            vyraz = PREPIS_POCTU
+        elif (
+            nazev in PREPISY
+            and len(uzel["children"]) == 1
+            and uzel["children"][0]["class"] == "COLUMN_REF"
+        ):
+            mira = self.sloupec(uzel["children"][0])
+            if any(f"{s}_{mira}" not in self.ulozene for s in ULOZENE[nazev]):
+                raise NelzePrepsat(nazev)
+            vyraz = PREPISY[nazev].format(mira=mira)
+        else:
+            raise NelzePrepsat(nazev)
+        self.pocet_agregaci += 1
+        novy = json.loads(_vyraz(vyraz))
+        novy["alias"] = uzel["alias"]
+        return novy
+
+    def __call__(self, uzel):
+        if isinstance(uzel, list):
+            return [self(polozka) for polozka in uzel]
+        if not isinstance(uzel, dict):
+            return uzel
+        trida = uzel.get("class")
+        if trida in NEPODPOROVANE:
+            raise NelzePrepsat(trida)
+        if trida == "COLUMN_REF":
+            nazev = self.sloupec(uzel)
+            if nazev not in self.povolene:
+                raise NelzePrepsat(nazev)
+            return dict(uzel, column_names=[nazev])
+        if trida == "FUNCTION" and uzel["function_name"].lower() in self.agregacni:
+            return self.agregace(uzel)
+        return {klic: self(hodnota) for klic, hodnota in uzel.items()}
+
+
+def prepis_dotaz(pripojeni, dotaz: str, tabulka: str, agregace: dict):
+    """přepíše agregační dotaz nad hlavní tabulkou na nejmenší
+    agregační tabulku, ze které jej lze spočítat, jinak vrátí None
+
+    Args:
+        pripojeni: připojení k databázi
+        dotaz: SQL dotaz
+        tabulka: hlavní tabulka datasetu
+        agregace: deklarace agregací z config.py (AGREGACE)
+    """
+    strom = _strom(pripojeni, dotaz)
+    if strom is None:
+        return None
+    uzel = strom["statements"][0]["node"]
+    zdroj = uzel.get("from_table") or {}
+    if (
+        uzel["type"] != "SELECT_NODE"
+        or uzel["cte_map"]["map"]
+        or zdroj.get("type") != "BASE_TABLE"
+        or zdroj["table_name"].lower() != tabulka.lower()
+        or zdroj["schema_name"] not in ("", "main")
+        or zdroj["sample"]
+        or zdroj["at_clause"]
+        or uzel["sample"]
+        or uzel["qualify"]
+    ):
+        return None
+
+    # existující agregační tabulky od nejmenší
+    existujici = dict(
+        pripojeni.execute(
+            "select table_name, estimated_size from duckdb_tables() "
+            "where schema_name = 'main'"
+        ).fetchall()
+    )
+    kandidati = sorted(
+        (nazev for nazev in agregace if nazev in existujici),
+        key=existujici.get,
+    )
+    aliasy = {polozka["alias"] for polozka in uzel["select_list"] if polozka["alias"]}
+    kvalifikatory = {tabulka.lower(), zdroj["alias"].lower()} - {""}
+    try:
+        puvodni = pripojeni.sql(dotaz)
+    except duckdb.Error:
+        return None
+    for nazev in kandidati:
+        dimenze = set(agregace[nazev].get("dimenze", []))
+        prepis = _Prepis(agregace[nazev], dimenze, kvalifikatory)
+        # ve where a group by se názvy sloupců neodkazují na aliasy
+        prepis_s_aliasy = _Prepis(agregace[nazev], dimenze | aliasy, kvalifikatory)
+        try:
+            novy = {
+                "where_clause": prepis(uzel["where_clause"]),
+                "group_expressions": prepis(uzel["group_expressions"]),
+                "select_list": prepis_s_aliasy(uzel["select_list"]),
+                "having": prepis_s_aliasy(uzel["having"]),
+                "modifiers": prepis_s_aliasy(uzel["modifiers"]),
+            }
+        except NelzePrepsat:
+            continue
+        seskupeny = (
+            novy["group_expressions"]
+            or uzel["aggregate_handling"] == "FORCE_AGGREGATES"
+            or prepis.pocet_agregaci
+            or prepis_s_aliasy.pocet_agregaci
+        )
+        if not seskupeny:
+            # dotaz bez seskupení vrací jednotlivé řádky
+            return None
+        # výstupní sloupce si ponechají původní názvy
+        for polozka, nazev_sloupce in zip(novy["select_list"], puvodni.columns):
+            polozka["alias"] = polozka["alias"] or nazev_sloupce
+        strom_agregace = json.loads(json.dumps(strom))
+        strom_agregace["statements"][0]["node"].update(
+            novy, from_table=dict(zdroj, table_name=nazev, schema_name="")
+        )
+        prepsany = pripojeni.execute(
+            "select json_deserialize_sql(?)", [json.dumps(strom_agregace)]
+        ).fetchone()[0]
+        # přepsaný dotaz musí vracet stejné sloupce i typy
+        try:
+            vysledek = pripojeni.sql(prepsany)
+        except duckdb.Error:
+            continue
+        if vysledek.columns == puvodni.columns and vysledek.types == puvodni.types:
+            return prepsany
+    return None
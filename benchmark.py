@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""modul pro měření výkonu celého zpracování.
+
+Vygeneruje syntetický datový soubor ve formátu zdrojových
+extraktů (oddělovač ";", české názvy sloupců, desetinné čárky,
+datumy DD.MM.YYYY), spustí jednotlivé etapy v samostatných
+procesech a vypíše čas, počet řádků za sekundu a maximální
+paměť (RSS, na windows null) každé etapy jako JSON. Etapa vyberci_dat
+exportuje celou tabulku do parquet.
+
+Příklad:
+    python benchmark.py --radky 1000000 --sloupce integer=2,decimal=4,date=1
+    python benchmark.py --radky 100000 --nastaveni PROUDOVE=True
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import subprocess
+from datetime import date, timedelta
+
+CESTA = os.path.dirname(os.path.abspath(__file__))
+
+# kód spouštěný pro jednotlivé etapy (v samostatném procesu)
+ETAPY = {
+    "tvurce_sql": "import tvurce_sql; tvurce_sql.main()",
+    "opravar_dat": "import opravar_dat; opravar_dat.main()",
+    "importer_dat": "import importer_dat; importer_dat.main()",
+    "oprav_a_nahraj": "import oprav_a_nahraj; oprav_a_nahraj.main()",
+    "vyberci_dat": (
+        "import vyberci_dat\n"
+        "v = vyberci_dat.VyberciDat()\n"
+        "v.pripoj_se_k_databazi(jen_pro_cteni=True)\n"
+        "v.zpracuj_davku({'List1': 'from ' + vyberci_dat.config.TABULKA})\n"
+        "v.odpoj_se_od_databaze()\n"
+    ),
+}
+VYCHOZI_ETAPY = "tvurce_sql,opravar_dat,importer_dat,vyberci_dat"
+
+# názvy sloupců podle typu, upraví je zjisti_nazvy_sloupcu
+NAZVY = {
+    "integer": "Číslo záznamu",
+    "decimal": "Náklady opravy a údržba (Kč)",
+    "date": "Datum účetní",
+    "timestamp": "Čas zápisu",
+    "varchar": "Název položky",
+}
+
+
+def rozloz_sloupce(popis):
+    """převede popis 'integer=2,decimal=3' na seznam typů sloupců"""
+    typy = []
+    for cast in popis.split(","):
+        typ, _, pocet = cast.partition("=")
+        if typ not in NAZVY:
+            raise ValueError(f"Neznámý typ sloupce: '{typ}'")
+        typy += [typ] * int(pocet or 1)
+    return typy
+
+
+def generuj_data(vystup, radky, typy):
+    """zapíše syntetický zdrojový soubor, hodnoty jsou
+    deterministické, aby byly běhy porovnatelné"""
+    datumy = [
+        (date(2025, 1, 1) + timedelta(days=i)).strftime("%d.%m.%Y") for i in range(365)
+    ]
+    hlavicka = [f"{NAZVY[typ]} {i}" for i, typ in enumerate(typy, start=1)]
+
+    def hodnota(typ, i, j):
+        if typ == "integer":
+            return str((i * (j + 7)) % 1000003)
+        if typ == "decimal":
+            return f"{(i * (j + 3)) % 100000},{i % 1000:03d}"
+        if typ == "date":
+            return datumy[(i + j) % 365]
+        if typ == "timestamp":
+            return f"{datumy[(i + j) % 365]} {i % 24:02d}:{i % 60:02d}:{j % 60:02d}"
+        return f"položka šroub {(i + j) % 5000}"
+
+    with open(vystup, "w", encoding="utf8") as soubor:
+        soubor.write(";".join(hlavicka) + "\n")
+        davka = []
+        for i in range(radky):
+            davka.append(";".join(hodnota(typ, i, j) for j, typ in enumerate(typy)))
+            if len(davka) == 10000:
+                soubor.write("\n".join(davka) + "\n")
+                davka = []
+        if davka:
+            soubor.write("\n".join(davka) + "\n")
+
+
+def zapis_config(slozka, nastaveni):
+    """zapíše config.py datasetu pro benchmark"""
+    with open(os.path.join(slozka, "config.py"), "w", encoding="utf8") as soubor:
+        soubor.write('"""konfigurační soubor benchmarku"""\n\n')
+        soubor.write(f'DB = "{os.path.join(slozka, "databaze.db")}"\n')
+        soubor.write('ZDROJ = "data.txt"\n')
+        soubor.write('HLAVICKA = "hlavicka.txt"\n')
+        soubor.write('ODDELOVAC = ";"\n')
+        soubor.write("UVOZOVKY = None\n")
+        soubor.write('TABULKA = "benchmark"\n')
+        # celou tabulku nelze pro velké počty řádků zapsat do excelu
+        # (nejvýše 1048576 řádků listu), etapa vyberci_dat proto
+        # exportuje do parquet, --nastaveni to může přepsat
+        soubor.write('FORMAT_EXPORTU = "parquet"\n')
+        for polozka in nastaveni:
+            soubor.write(f"{polozka}\n")
+
+
+def spust_etapu(slozka, nazev):
+    """spustí etapu v samostatném procesu, vrátí čas
+    a maximální RSS procesu v MB (None, kde os.wait4 není)"""
+    kod = ETAPY[nazev]
+    prostredi = dict(os.environ, SLOZKA=slozka)
+    rss = None
+    with tempfile.TemporaryFile() as chyby:
+        zacatek = time.perf_counter()
+        if hasattr(os, "wait4"):
+            proces = subprocess.Popen(
+                [sys.executable, "-c", kod],
+                cwd=CESTA,
+                env=prostredi,
+                stdout=subprocess.DEVNULL,
+                stderr=chyby,
+            )
+            _, stav, vyuziti = os.wait4(proces.pid, 0)
+            navrat = os.waitstatus_to_exitcode(stav)
+            # ru_maxrss je na linuxu v kB
+            rss = vyuziti.ru_maxrss / 1024
+        else:
+            # windows, paměť podřízeného procesu se neměří
+            navrat = subprocess.run(
+                [sys.executable, "-c", kod],
+                cwd=CESTA,
+                env=prostredi,
+                stdout=subprocess.DEVNULL,
+                stderr=chyby,
+                check=False,
+            ).returncode
+        cas = time.perf_counter() - zacatek
+        if navrat != 0:
+            chyby.seek(0)
+            raise RuntimeError(
+                f"Etapa {nazev} selhala:\n{chyby.read().decode('utf8', 'replace')}"
+            )
+    return cas, rss
+
+
+def main():
+    """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
+    fmt = "%(asctime)s: %(message)s"
+    logging.basicConfig(format=fmt, level=logging.INFO, datefmt="%H:%M:%S")
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--radky", type=int, default=10000)
+    parser.add_argument(
+        "--sloupce", default="integer=2,decimal=4,date=1,timestamp=1,varchar=2"
+    )
+    parser.add_argument("--etapy", default=VYCHOZI_ETAPY)
+    parser.add_argument(
+        "--nastaveni",
+        action="append",
+        default=[],
+        help="řádek přidaný do config.py, např. PROUDOVE=True",
+    )
+    parser.add_argument(
+        "--slozka",
+        help="nová složka pro data, po běhu se ponechá (jinak dočasná)",
+    )
+    parser.add_argument(
+        "--ponechat", action="store_true", help="nemazat dočasnou složku s daty"
+    )
+    parser.add_argument("--vystup", help="soubor pro JSON výsledek")
+    argumenty = parser.parse_args()
+    for nazev in argumenty.etapy.split(","):
+        if nazev not in ETAPY:
+            parser.error(f"neznámá etapa '{nazev}', možnosti: {', '.join(ETAPY)}")
+
+    logging.info("Spuštění skriptu")
+
+    # config.py složky se přepíše, proto nelze použít existující
+    # složku (např. dataset), smaže se jen vytvořená dočasná složka
+    if argumenty.slozka:
+        slozka = os.path.abspath(argumenty.slozka)
+        if os.path.exists(slozka):
+            parser.error(f"složka '{argumenty.slozka}' už existuje, zadejte novou")
+        os.makedirs(slozka)
+        smazat = False
+    else:
+        slozka = tempfile.mkdtemp(prefix="benchmark_")
+        smazat = not argumenty.ponechat
+    typy = rozloz_sloupce(argumenty.sloupce)
+    zapis_config(slozka, argumenty.nastaveni)
+
+    zdroj = os.path.join(slozka, "data.txt")
+    zacatek = time.perf_counter()
+    generuj_data(zdroj, argumenty.radky, typy)
+    logging.info("Data vygenerována za %.2f s", time.perf_counter() - zacatek)
+
+    vysledek = {
+        "radky": argumenty.radky,
+        "sloupce": typy,
+        "nastaveni": argumenty.nastaveni,
+        "velikost_souboru_mb": os.path.getsize(zdroj) / 1024**2,
+        "etapy": {},
+    }
+    try:
+        for nazev in argumenty.etapy.split(","):
+            logging.info("Spouštím etapu %s", nazev)
+            cas, rss = spust_etapu(slozka, nazev)
+            vysledek["etapy"][nazev] = {
+                "cas_s": round(cas, 3),
+                "radky_za_s": round(argumenty.radky / cas, 1),
+                "max_rss_mb": round(rss, 1) if rss is not None else None,
+            }
+        vysledek["celkem_s"] = round(
+            sum(etapa["cas_s"] for etapa in vysledek["etapy"].values()), 3
+        )
+    finally:
+        if smazat:
+            shutil.rmtree(slozka, ignore_errors=True)
+
+    vypis = json.dumps(vysledek, ensure_ascii=False, indent=2)
+    if argumenty.vystup:
+        with open(argumenty.vystup, "w", encoding="utf8") as soubor:
+            soubor.write(vypis)
+    print(vypis)
+
+    logging.info("Ukončení skriptu")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""modul pro dávkové zpracování všech datasetů
+(složek s config.py). Zjištění typů a opravu dat
+provádí souběžně v procesech, import do databáze
+provádí postupně přes jediné připojení."""
+
+import os
+import sys
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import duckdb
+
+from nastaveni import nacti_config, zvolena_slozka
+
+CESTA = os.path.dirname(os.path.abspath(__file__))
+POCET_PROCESU = os.cpu_count()
+
+
+def najdi_datasety():
+    """vrátí seznam složek, které obsahují config.py"""
+    return sorted(
+        slozka
+        for slozka in os.listdir(CESTA)
+        if os.path.isfile(os.path.join(CESTA, slozka, "config.py"))
+    )
+
+
+def bez_volby_slozka(argumenty):
+    """vrátí argumenty příkazové řádky bez volby --slozka"""
+    vysledek = []
+    preskocit = False
+    for argument in argumenty:
+        if preskocit:
+            preskocit = False
+        elif argument == "--slozka":
+            preskocit = True
+        elif not argument.startswith("--slozka="):
+            vysledek.append(argument)
+    return vysledek
+
+
+def priprav_dataset(slozka):
+    """zjistí typy a opraví data jednoho datasetu,
+    běží v samostatném procesu, vrací časy etap"""
+    # proces zdědí argumenty rodiče, volba --slozka by přebila
+    # složku zpracovávaného datasetu
+    sys.argv = bez_volby_slozka(sys.argv)
+    os.environ["SLOZKA"] = slozka
+    zvolena_slozka.cache_clear()
+    # moduly se importují až v procesu, aby načetly config datasetu
+    import tvurce_sql
+    import opravar_dat
+
+    casy = {}
+    zacatek = time.perf_counter()
+    tvurce_sql.main()
+    casy["tvurce_sql"] = time.perf_counter() - zacatek
+    zacatek = time.perf_counter()
+    opravar_dat.main()
+    casy["opravar_dat"] = time.perf_counter() - zacatek
+    return casy
+
+
+def importuj_dataset(pripojeni, slozka):
+    """nahraje připravený dataset přes sdílené připojení"""
+    from importer_dat import (
+        ImporterDat,
+        importuj,
+    )
+
+    nastaveni = nacti_config(slozka)
+    importer_dat = ImporterDat(nastaveni, slozka)
+    if importer_dat.db not in pripojeni:
+        pripojeni[importer_dat.db] = duckdb.connect(importer_dat.db)
+    importer_dat.con = pripojeni[importer_dat.db]
+    importuj(importer_dat)
+    importer_dat.odeber_docasne_soubory()
+
+
+def vypis_souhrn(vysledky):
+    """vypíše časy a chyby jednotlivých datasetů"""
+    logging.info("Souhrn dávkového zpracování:")
+    for slozka, (casy, chyba) in sorted(vysledky.items()):
+        if chyba:
+            logging.info("  %s: CHYBA %s", slozka, chyba)
+        else:
+            popis = ", ".join(f"{etapa} {cas:.2f} s" for etapa, cas in casy.items())
+            logging.info("  %s: %s", slozka, popis)
+
+
+def main():
+    """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
+    fmt = "%(asctime)s: %(message)s"
+    logging.basicConfig(format=fmt, level=logging.INFO, datefmt="%H:%M:%S")
+
+    logging.info("Spuštění skriptu")
+
+    datasety = najdi_datasety()
+    logging.info("Nalezené datasety: %s", datasety)
+    if not datasety:
+        return
+
+    vysledky = {}
+    pripojeni = {}
+    kontext = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=POCET_PROCESU, mp_context=kontext, max_tasks_per_child=1
+    ) as pool:
+        ulohy = {pool.submit(priprav_dataset, slozka): slozka for slozka in datasety}
+        for uloha in as_completed(ulohy):
+            slozka = ulohy[uloha]
+            try:
+                casy = uloha.result()
+                zacatek = time.perf_counter()
+                importuj_dataset(pripojeni, slozka)
+                casy["importer_dat"] = time.perf_counter() - zacatek
+                vysledky[slozka] = (casy, None)
+            except Exception as e:
+                vysledky[slozka] = ({}, e)
+
+    for con in pripojeni.values():
+        con.commit()
+        con.close()
+
+    vypis_souhrn(vysledky)
+    logging.info("Ukončení skriptu")
+    if any(chyba for _, chyba in vysledky.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
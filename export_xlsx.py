@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""modul pro rychlý proudový export dat do xlsx.
+
+Listy se zapisují přímo jako XML do dočasných souborů
+a při uložení se vloží do kopie šablony, takže se zachová
+formátování šablony (písmo, výšky řádků, motiv) a v paměti
+není nikdy celý sešit.
+"""
+
+import re
+import shutil
+import tempfile
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+import numpy
+import pandas
+from pandas.api import types
+
+LIST_SABLONY = "xl/worksheets/sheet1.xml"
+TYP_LISTU = (
+    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"
+)
+OBSAH_LISTU = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+ZACATEK_EXCELU = datetime(1899, 12, 30)
+# data listu šablony (prázdná i s buňkami) a jednoznačné id listu,
+# které se do kopií listů nesmí opakovat
+DATA_LISTU = re.compile(r"<sheetData\s*/>|<sheetData\b[^>]*>.*?</sheetData>", re.S)
+UID_LISTU = re.compile(r'\s+xr:uid="[^"]*"')
+PRAZDNA = "<c/>"
+
+# znaky, které xml nepovoluje
+_NEPLATNE_ZNAKY = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _text(hodnota: str) -> str:
+    """buňka s textem"""
+    hodnota = escape(_NEPLATNE_ZNAKY.sub("", hodnota))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{hodnota}</t></is></c>'
+
+
+def _cislo(hodnota) -> str:
+    """buňka s číslem, NaN a nekonečno jsou prázdné"""
+    if pandas.isna(hodnota) or hodnota in (float("inf"), float("-inf")):
+        return PRAZDNA
+    return f"<c><v>{hodnota}</v></c>"
+
+
+def _bunka(hodnota, styl_datumu: int) -> str:
+    """převede libovolnou hodnotu na xml buňku"""
+    if hodnota is None or hodnota is pandas.NaT:
+        return PRAZDNA
+    if isinstance(hodnota, str):
+        return _text(hodnota)
+    if types.is_bool(hodnota):
+        return f'<c t="b"><v>{int(hodnota)}</v></c>'
+    if isinstance(hodnota, (int, float, Decimal)):
+        return _cislo(hodnota)
+    if isinstance(hodnota, datetime):
+        rozdil = hodnota.replace(tzinfo=None) - ZACATEK_EXCELU
+        return f'<c s="{styl_datumu}"><v>{rozdil.total_seconds() / 86400}</v></c>'
+    if isinstance(hodnota, date):
+        return _bunka(datetime.combine(hodnota, time()), styl_datumu)
+    if types.is_scalar(hodnota) and pandas.isna(hodnota):
+        return PRAZDNA
+    if types.is_number(hodnota):
+        return _cislo(hodnota.item() if hasattr(hodnota, "item") else hodnota)
+    return _text(str(hodnota))
+
+
+def _bunky_sloupce(sloupec: pandas.Series, styl_datumu: int) -> list[str]:
+    """převede celý sloupec dataframe na seznam xml buněk,
+    pro číselné a datumové sloupce bez kontroly typu každé hodnoty"""
+    if types.is_bool_dtype(sloupec.dtype):
+        return [_bunka(hodnota, styl_datumu) for hodnota in sloupec.tolist()]
+    if types.is_numeric_dtype(sloupec.dtype):
+        if types.is_extension_array_dtype(sloupec.dtype):
+            return [_cislo(hodnota) for hodnota in sloupec.tolist()]
+        platne = numpy.isfinite(sloupec.to_numpy())
+        bunky = "<c><v>" + sloupec.astype(str) + "</v></c>"
+        return bunky.where(platne, PRAZDNA).tolist()
+    if types.is_datetime64_any_dtype(sloupec.dtype):
+        if getattr(sloupec.dt, "tz", None) is not None:
+            sloupec = sloupec.dt.tz_localize(None)
+        dny = (sloupec - pandas.Timestamp(ZACATEK_EXCELU)) / pandas.Timedelta(days=1)
+        bunky = f'<c s="{styl_datumu}"><v>' + dny.astype(str) + "</v></c>"
+        return bunky.where(dny.notna(), PRAZDNA).tolist()
+    return [_bunka(hodnota, styl_datumu) for hodnota in sloupec.tolist()]
+
+
+class ListXlsx:
+    """Jeden list sešitu, řádky se zapisují do dočasného souboru"""
+
+    def __init__(self, nazev: str, styl_datumu: int):
+        self.nazev = nazev
+        self.styl_datumu = styl_datumu
+        self.soubor = tempfile.TemporaryFile()
+        self.radek = 0
+
+    def _zapis(self, bunky) -> None:
+        """zapíše jeden řádek složený z hotových buněk"""
+        self.radek += 1
+        self.soubor.write(
+            f'<row r="{self.radek}">{"".join(bunky)}</row>'.encode("utf8")
+        )
+
+    def zapis_radek(self, hodnoty) -> None:
+        """zapíše jeden řádek hodnot (např. hlavičku)"""
+        self._zapis(_bunka(hodnota, self.styl_datumu) for hodnota in hodnoty)
+
+    def zapis_dataframe(self, df: pandas.DataFrame) -> None:
+        """zapíše řádky dataframe, převádí se po sloupcích"""
+        sloupce = [
+            _bunky_sloupce(df.iloc[:, i], self.styl_datumu)
+            for i in range(df.shape[1])
+        ]
+        for bunky in zip(*sloupce):
+            self._zapis(bunky)
+
+
+class ExportXlsx:
+    """Sešit vytvořený ze šablony, do kterého se listy
+    zapisují proudově"""
+
+    def __init__(self, sablona: str, vystup: str):
+        self.sablona = sablona
+        self.vystup = vystup
+        self.listy = []
+        with zipfile.ZipFile(self.sablona) as archiv:
+            self.styly, self.styl_datumu = self._pridej_styl_datumu(
+                archiv.read("xl/styles.xml").decode("utf8")
+            )
+            self.kostra = archiv.read(LIST_SABLONY).decode("utf8")
+
+    @staticmethod
+    def _pridej_styl_datumu(styly: str):
+        """přidá do stylů šablony formát datumu s časem,
+        vrátí upravené styly a index nového stylu"""
+        nalez = re.search(r'<cellXfs count="(\d+)">', styly)
+        index = int(nalez.group(1))
+        styl = (
+            '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" '
+            'xfId="0" applyNumberFormat="1"/>'
+        )
+        styly = styly.replace(nalez.group(0), f'<cellXfs count="{index + 1}">', 1)
+        styly = styly.replace("</cellXfs>", f"{styl}</cellXfs>", 1)
+        return styly, index
+
+    def pridej_list(self, nazev: str) -> ListXlsx:
+        """přidá nový list, název se upraví podle pravidel excelu,
+        stejné názvy (excel nerozlišuje velikost písmen) se rozliší
+        pořadovým číslem"""
+        nazev = re.sub(r"[\[\]:*?/\\]", "_", nazev)[:31] or f"List{len(self.listy) + 1}"
+        pouzite = {list_xlsx.nazev.lower() for list_xlsx in self.listy}
+        zaklad, pocet = nazev, 1
+        while nazev.lower() in pouzite:
+            pocet += 1
+            pripona = f"_{pocet}"
+            nazev = zaklad[: 31 - len(pripona)] + pripona
+        list_xlsx = ListXlsx(nazev, self.styl_datumu)
+        self.listy.append(list_xlsx)
+        return list_xlsx
+
+    def _obal_listu(self, poradi: int):
+        """vrátí začátek a konec xml listu podle šablony"""
+        kostra = re.sub(r"<dimension [^>]*/>", "", self.kostra)
+        kostra = UID_LISTU.sub("", kostra)
+        if poradi > 0:
+            kostra = kostra.replace(' tabSelected="1"', "")
+        nalez = DATA_LISTU.search(kostra)
+        if nalez is None:
+            raise ValueError(f"List šablony {self.sablona} neobsahuje sheetData")
+        return (
+            kostra[: nalez.start()] + "<sheetData>",
+            "</sheetData>" + kostra[nalez.end() :],
+        )
+
+    def _uprav_cast(self, jmeno: str, obsah: str) -> str:
+        """upraví xml části šablony podle seznamu listů"""
+        if jmeno == "[Content_Types].xml":
+            obsah = re.sub(
+                rf'<Override PartName="[^"]*" ContentType="{re.escape(OBSAH_LISTU)}"/>',
+                "",
+                obsah,
+            )
+            listy = "".join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                f'ContentType="{OBSAH_LISTU}"/>'
+                for i in range(1, len(self.listy) + 1)
+            )
+            obsah = obsah.replace("</Types>", f"{listy}</Types>")
+        elif jmeno == "xl/_rels/workbook.xml.rels":
+            obsah = re.sub(
+                rf'<Relationship [^>]*Type="{re.escape(TYP_LISTU)}"[^>]*/>', "", obsah
+            )
+            listy = "".join(
+                f'<Relationship Id="rIdList{i}" Type="{TYP_LISTU}" '
+                f'Target="worksheets/sheet{i}.xml"/>'
+                for i in range(1, len(self.listy) + 1)
+            )
+            obsah = obsah.replace("</Relationships>", f"{listy}</Relationships>")
+        elif jmeno == "xl/workbook.xml":
+            listy = "".join(
+                f'<sheet name="{escape(list_xlsx.nazev, {chr(34): "&quot;"})}" '
+                f'sheetId="{i}" r:id="rIdList{i}"/>'
+                for i, list_xlsx in enumerate(self.listy, start=1)
+            )
+            obsah = re.sub(
+                r"<sheets>.*?</sheets>", f"<sheets>{listy}</sheets>", obsah, flags=re.S
+            )
+        elif jmeno == "docProps/app.xml":
+            obsah = self._uprav_vlastnosti(obsah)
+        elif jmeno == "xl/styles.xml":
+            obsah = self.styly
+        return obsah
+
+    def _uprav_vlastnosti(self, obsah: str) -> str:
+        """upraví počet a názvy listů ve vlastnostech dokumentu,
+        popisek skupiny listů (např. "Listy") zůstane ze šablony"""
+        nalez = re.search(r"<HeadingPairs>.*?<vt:lpstr>(.*?)</vt:lpstr>", obsah, re.S)
+        popisek = nalez.group(1) if nalez else "Worksheets"
+        skupiny = (
+            '<HeadingPairs><vt:vector size="2" baseType="variant">'
+            f"<vt:variant><vt:lpstr>{popisek}</vt:lpstr></vt:variant>"
+            f"<vt:variant><vt:i4>{len(self.listy)}</vt:i4></vt:variant>"
+            "</vt:vector></HeadingPairs>"
+        )
+        nazvy = "".join(
+            f"<vt:lpstr>{escape(list_xlsx.nazev)}</vt:lpstr>"
+            for list_xlsx in self.listy
+        )
+        casti = (
+            f'<TitlesOfParts><vt:vector size="{len(self.listy)}" baseType="lpstr">'
+            f"{nazvy}</vt:vector></TitlesOfParts>"
+        )
+        obsah = re.sub(r"<HeadingPairs>.*?</HeadingPairs>", skupiny, obsah, flags=re.S)
+        return re.sub(r"<TitlesOfParts>.*?</TitlesOfParts>", casti, obsah, flags=re.S)
+
+    def uloz(self) -> None:
+        """sestaví výsledný soubor ze šablony a zapsaných listů"""
+        with zipfile.ZipFile(self.sablona) as sablona, zipfile.ZipFile(
+            self.vystup, "w", zipfile.ZIP_DEFLATED
+        ) as vystup:
+            for polozka in sablona.infolist():
+                if polozka.filename.startswith("xl/worksheets/"):
+                    continue
+                obsah = sablona.read(polozka)
+                if polozka.filename.endswith((".xml", ".rels")):
+                    obsah = self._uprav_cast(polozka.filename, obsah.decode("utf8"))
+                vystup.writestr(polozka.filename, obsah)
+            for i, list_xlsx in enumerate(self.listy, start=1):
+                zacatek, konec = self._obal_listu(i - 1)
+                with vystup.open(f"xl/worksheets/sheet{i}.xml", "w") as cil:
+                    cil.write(zacatek.encode("utf8"))
+                    list_xlsx.soubor.seek(0)
+                    shutil.copyfileobj(list_xlsx.soubor, cil)
+                    cil.write(konec.encode("utf8"))
+                list_xlsx.soubor.close()
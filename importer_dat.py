@@ -4,32 +4,46 @@ duckdb"""
 
 import os
 import logging
-import importlib.util
 import duckdb
 
-from master_config import SLOZKA
-
-# vytvoř absolutní cestu k modulu config.py
-cesta_k_modulu = os.path.join(os.path.dirname(__file__), SLOZKA, "config.py")
-
-# vytvoř import spec
-spec = importlib.util.spec_from_file_location("config", cesta_k_modulu)
-config = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(config)
+from agregace import vyber_agregace
+from nastaveni import nacti_config, zvolena_slozka
+from metriky import instrumentuj_instanci, zaznamenej_radky
 
 
 class ImporterDat:
     """odesílá sql příkazy pro smazání a vytvoření
     tabulky v databázi, importuje data"""
 
-    def __init__(self):
+    def __init__(self, nastaveni=None, slozka=None):
+        # nastavení a složku jiného datasetu lze předat (dávkový import),
+        # jinak se použije zvolený dataset
+        slozka = slozka or zvolena_slozka()
+        nastaveni = nastaveni or nacti_config(slozka)
         self.prikaz_create = ""
-        self.tabulka = config.TABULKA
+        self.tabulka = nastaveni.TABULKA
         self.con = None
         self.cesta = os.path.dirname(__file__)
-        self.db = os.path.join(self.cesta, config.DB)
-        self.sql_create = os.path.join(self.cesta, SLOZKA, config.HLAVICKA)
-        self.tmp = os.path.join(self.cesta, SLOZKA, "tmp.csv")
+        self.db = os.path.join(self.cesta, nastaveni.DB)
+        self.sql_create = os.path.join(self.cesta, slozka, nastaveni.HLAVICKA)
+        # předávací soubor od opravar_dat: "csv", "parquet" nebo "arrow"
+        self.format_predani = getattr(nastaveni, "FORMAT_PREDANI", "csv")
+        self.tmp = os.path.join(self.cesta, slozka, f"tmp.{self.format_predani}")
+        # režim importu: "nahradit" (smaž a vytvoř), "pripojit" (jen
+        # řádky novější než maximum vodoznaku), "oddily" (nahradí
+        # jen oddíly podle klíčových sloupců)
+        self.rezim = getattr(nastaveni, "REZIM_IMPORTU", "nahradit")
+        self.vodoznak = getattr(nastaveni, "VODOZNAK", None)
+        self.klicove_sloupce = getattr(nastaveni, "KLICOVE_SLOUPCE", [])
+        # agregační tabulky obnovované po importu (viz agregace.py)
+        self.agregace = getattr(nastaveni, "AGREGACE", None) or {}
+        # pořadí řádků při nahrání (kvůli min/max zonemapám duckdb),
+        # indexy (název -> sloupce) a primární klíč vytvořené po nahrání
+        self.serazeni = getattr(nastaveni, "SERAZENI", None) or []
+        self.indexy = getattr(nastaveni, "INDEXY", None) or {}
+        self.primarni_klic = getattr(nastaveni, "PRIMARNI_KLIC", None) or []
+        # měření metod podle nastavení tohoto datasetu
+        instrumentuj_instanci(self, nastaveni, os.path.join(self.cesta, slozka))
 
     def pripoj_se_k_databazi(self):
         """vytvoř připoení k databázi"""
@@ -59,29 +73,270 @@ class ImporterDat:
             self.con.execute(self.prikaz_create)
         logging.info("Vytvoření tabulky proběhlo v pořádku")
 
+    def razeni(self) -> str:
+        """vrátí klauzuli order by podle sloupců pro seřazení"""
+        if not self.serazeni:
+            return ""
+        return f" order by {', '.join(self.serazeni)}"
+
     def nahraj_data(self) -> None:
-        """nahraj csv data do tabulky"""
+        """nahraj opravená data do tabulky, při nastaveném seřazení
+        se data nahrají přes dočasnou tabulku v daném pořadí"""
         logging.info("Začínám nahrávat a importovat data..")
+        cil = "stage" if self.serazeni else self.tabulka
+        if self.serazeni:
+            self.con.execute(
+                f"create or replace temp table stage as "
+                f"select * from {self.tabulka} limit 0"
+            )
+        pocet = self.nahraj_predani(cil)
+        if self.serazeni:
+            self.con.execute(
+                f"insert into {self.tabulka} select * from stage{self.razeni()}"
+            )
+            self.con.execute("drop table stage")
+        zaznamenej_radky(self, pocet)
+        logging.info("Data úspěšně importovaná")
+
+    def nahraj_predani(self, cil: str) -> int:
+        """nahraj předávací soubor z opravar_dat do tabulky cil,
+        parquet a arrow už mají typované sloupce, takže se text
+        znovu neparsuje, vrátí počet nahraných řádků"""
+        if self.format_predani == "csv":
+            vysledek = self.con.execute(
+                f"""
+                copy {cil}
+                from '{self.tmp}'
+                    (delimiter ';',
+                    quote '"')
+                """
+            )
+        elif self.format_predani == "parquet":
+            vysledek = self.con.execute(
+                f"insert into {cil} select * from read_parquet('{self.tmp}')"
+            )
+        elif self.format_predani == "arrow":
+            import pyarrow
+            import pyarrow.ipc
+
+            # soubor se mapuje do paměti, dávky se nekopírují
+            predani = pyarrow.ipc.open_file(pyarrow.memory_map(self.tmp)).read_all()
+            self.con.register("predani", predani)
+            vysledek = self.con.execute(f"insert into {cil} select * from predani")
+            self.con.unregister("predani")
+        else:
+            raise ValueError(f"Neznámý formát předání: '{self.format_predani}'")
+        pocet = vysledek.fetchone()[0]
+        zaznamenej_radky(self, pocet)
+        return pocet
+
+    def nahraj_davky(self, davky) -> None:
+        """smaž a znovu vytvoř tabulku a nahraj do ní arrow dávky
+        opravených řádků, bez mezikroku přes tmp.csv, vše v jedné
+        transakci, takže chyba při opravě řádků (např. neplatné
+        datum) ponechá v databázi původní tabulku"""
+        logging.info("Začínám nahrávat dávky do databáze..")
+        self.con.begin()
+        try:
+            self.smaz_tabulku()
+            self.vytvor_tabulku()
+            pocet = 0
+            for davka in davky:
+                self.con.register("davka", davka)
+                self.con.execute(f"insert into {self.tabulka} select * from davka")
+                self.con.unregister("davka")
+                pocet += davka.num_rows
+        except BaseException:
+            self.con.rollback()
+            raise
+        self.con.commit()
+        zaznamenej_radky(self, pocet)
+        logging.info("Data úspěšně importovaná")
+
+    def nahraj_data_sql(self, prikaz: str) -> None:
+        """nahraj data příkazem create table as select, opravy
+        hodnot provede přímo databáze"""
+        logging.info("Začínám importovat a opravovat data v databázi..")
+        self.con.execute(prikaz)
+        logging.info("Data úspěšně importovaná")
+
+    def existuje_tabulka(self, tabulka=None) -> bool:
+        """zjistí, zda cílová (nebo zadaná) tabulka v databázi existuje"""
+        pocet = self.con.execute(
+            "select count(*) from information_schema.tables where table_name = ?",
+            [tabulka or self.tabulka],
+        ).fetchone()[0]
+        return pocet > 0
+
+    def nahraj_data_prirustkove(self) -> None:
+        """nahraj do tabulky jen přírůstek dat z předávacího souboru,
+        celý import proběhne v jedné transakci"""
+        logging.info("Začínám přírůstkový import (%s)..", self.rezim)
+        self.con.begin()
+        try:
+            if not self.existuje_tabulka():
+                self.con.execute(self.prikaz_create)
+            self.con.execute(
+                f"create or replace temp table stage as "
+                f"select * from {self.tabulka} limit 0"
+            )
+            self.nahraj_predani("stage")
+            # změněné řádky hlavní tabulky pro obnovu agregací
+            zmeny = "select * from stage"
+            if self.rezim == "pripojit":
+                maximum = f"(select max({self.vodoznak}) from {self.tabulka})"
+                podminka = f"{maximum} is null or {self.vodoznak} > {maximum}"
+                # ve stage zůstanou jen nové řádky
+                self.con.execute(f"delete from stage where ({podminka}) is not true")
+            elif self.rezim == "oddily":
+                shoda = " and ".join(
+                    f"s.{sloupec} is not distinct from {self.tabulka}.{sloupec}"
+                    for sloupec in self.klicove_sloupce
+                )
+                if self.agregace:
+                    self.con.execute(
+                        f"create or replace temp table smazane as "
+                        f"select * from {self.tabulka} "
+                        f"where exists (select 1 from stage s where {shoda})"
+                    )
+                    zmeny += " union all select * from smazane"
+                self.con.execute(
+                    f"delete from {self.tabulka} "
+                    f"where exists (select 1 from stage s where {shoda})"
+                )
+            else:
+                raise ValueError(f"Neznámý režim importu: '{self.rezim}'")
+            pocet = self.con.execute(
+                f"insert into {self.tabulka} select * from stage{self.razeni()}"
+            ).fetchone()[0]
+            self.obnov_agregace(zmeny)
+            self.con.execute("drop table stage")
+            self.con.execute("drop table if exists smazane")
+        except BaseException:
+            self.con.rollback()
+            raise
+        self.con.commit()
+        zaznamenej_radky(self, pocet)
+        logging.info("Přírůstkový import dokončen, nahráno řádků: %s", pocet)
+
+    def serad_tabulku(self) -> None:
+        """seřadí již nahranou tabulku podle sloupců pro seřazení
+        (po nahrání dávkami nebo příkazem create table as select)"""
+        if not self.serazeni:
+            return
         self.con.execute(
-            f"""
-            copy {self.tabulka}
-            from '{self.tmp}'
-                (delimiter ';',
-                quote '"')
-            """
+            f"create or replace table {self.tabulka} as "
+            f"select * from {self.tabulka}{self.razeni()}"
         )
-        logging.info("Data úspěšně importovaná")
+        logging.info("Tabulka seřazena podle %s", ", ".join(self.serazeni))
+
+    def vytvor_indexy(self) -> None:
+        """vytvoří primární klíč a indexy z nastavení,
+        pokud v tabulce ještě nejsou"""
+        if self.primarni_klic:
+            pocet = self.con.execute(
+                "select count(*) from duckdb_constraints() "
+                "where table_name = ? and constraint_type = 'PRIMARY KEY'",
+                [self.tabulka],
+            ).fetchone()[0]
+            if not pocet:
+                self.con.execute(
+                    f"alter table {self.tabulka} "
+                    f"add primary key ({', '.join(self.primarni_klic)})"
+                )
+                logging.info("Primární klíč vytvořen")
+        for nazev, sloupce in self.indexy.items():
+            self.con.execute(
+                f"create index if not exists {nazev} "
+                f"on {self.tabulka} ({', '.join(sloupce)})"
+            )
+            logging.info("Index %s vytvořen", nazev)
+
+    def vytvor_agregace(self) -> None:
+        """vytvoří znovu všechny agregační tabulky z hlavní tabulky"""
+        for nazev, definice in self.agregace.items():
+            self.con.execute(
+                f"create or replace table {nazev} as "
+                f"{vyber_agregace(self.tabulka, definice)}"
+            )
+            logging.info("Agregační tabulka %s vytvořena", nazev)
+
+    def obnov_agregace(self, zmeny: str) -> None:
+        """přepočítá v agregačních tabulkách jen skupiny,
+        kterých se týkají změněné řádky
+
+        Args:
+            zmeny: select vracející přidané a smazané řádky hlavní tabulky
+        """
+        for nazev, definice in self.agregace.items():
+            dimenze = definice.get("dimenze", [])
+            if not dimenze or not self.existuje_tabulka(nazev):
+                self.con.execute(
+                    f"create or replace table {nazev} as "
+                    f"{vyber_agregace(self.tabulka, definice)}"
+                )
+                continue
+            self.con.execute(
+                f"create or replace temp table klice as "
+                f"select distinct {', '.join(dimenze)} from ({zmeny})"
+            )
+            shoda = " and ".join(
+                f"k.{sloupec} is not distinct from z.{sloupec}" for sloupec in dimenze
+            )
+            self.con.execute(
+                f"delete from {nazev} z "
+                f"where exists (select 1 from klice k where {shoda})"
+            )
+            zdroj = (
+                f"(select * from {self.tabulka} z "
+                f"where exists (select 1 from klice k where {shoda}))"
+            )
+            self.con.execute(f"insert into {nazev} {vyber_agregace(zdroj, definice)}")
+            self.con.execute("drop table klice")
+            logging.info("Agregační tabulka %s obnovena", nazev)
+
+    def zvys_generaci(self):
+        """zvýší číslo generace načtení tabulky a jejích agregací,
+        podle něj se zneplatní uložené výsledky dotazů"""
+        self.con.execute(
+            "create table if not exists generace_nacteni "
+            "(tabulka varchar primary key, generace bigint)"
+        )
+        for tabulka in [self.tabulka, *self.agregace]:
+            self.con.execute(
+                "insert into generace_nacteni values (?, 1) "
+                "on conflict (tabulka) do update set generace = generace + 1",
+                [tabulka],
+            )
 
     def odeber_docasne_soubory(self):
         """odeber již nepotřebné soubory (už byly nahrané
         do databáze)"""
         if os.path.exists(self.tmp):
             os.remove(self.tmp)
-            logging.info("Soubor tmp.csv byl úspěšně smazán")
+            logging.info(
+                "Soubor %s byl úspěšně smazán", os.path.basename(self.tmp)
+            )
         else:
             logging.info("Soubor neexistuje")
 
 
+def importuj(importer_dat):
+    """provede import jednoho datasetu na otevřeném připojení"""
+    if importer_dat.rezim == "nahradit":
+        importer_dat.smaz_tabulku()
+        importer_dat.nacti_prikaz_create()
+        importer_dat.vytvor_tabulku()
+        importer_dat.nahraj_data()
+        importer_dat.vytvor_indexy()
+        importer_dat.vytvor_agregace()
+    else:
+        importer_dat.nacti_prikaz_create()
+        importer_dat.nahraj_data_prirustkove()
+        importer_dat.vytvor_indexy()
+    importer_dat.zvys_generaci()
+
+
 def main():
     """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
     fmt = "%(asctime)s: %(message)s"
@@ -91,10 +346,7 @@ def main():
 
     importer_dat = ImporterDat()
     importer_dat.pripoj_se_k_databazi()
-    importer_dat.smaz_tabulku()
-    importer_dat.nacti_prikaz_create()
-    importer_dat.vytvor_tabulku()
-    importer_dat.nahraj_data()
+    importuj(importer_dat)
     importer_dat.odpoj_se_od_databaze()
     importer_dat.odeber_docasne_soubory()
 
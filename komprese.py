@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""modul pro čtení komprimovaných zdrojových souborů.
+
+Zdroj může být nekomprimovaný, gzip (.gz), zstd (.zst) nebo
+zip (.zip, použije se první soubor v archivu). Komprese se
+pozná podle přípony, jinak podle prvních bajtů souboru.
+Soubor se rozbaluje proudově při čtení, na disk se nezapisuje.
+"""
+
+import io
+import os
+import gzip
+import zipfile
+
+PRIPONY = {".gz": "gzip", ".gzip": "gzip", ".zst": "zstd", ".zip": "zip"}
+ZNACKY = {
+    b"\x1f\x8b": "gzip",
+    b"\x28\xb5\x2f\xfd": "zstd",
+    b"PK\x03\x04": "zip",
+}
+
+
+def zjisti_kompresi(cesta: str):
+    """vrátí "gzip", "zstd", "zip" nebo None pro nekomprimovaný soubor"""
+    komprese = PRIPONY.get(os.path.splitext(cesta)[1].lower())
+    if komprese:
+        return komprese
+    try:
+        with open(cesta, "rb") as soubor:
+            zacatek = soubor.read(4)
+    except OSError:
+        return None
+    for znacka, komprese in ZNACKY.items():
+        if zacatek.startswith(znacka):
+            return komprese
+    return None
+
+
+def _otevri_zstd(cesta: str):
+    """otevře zstd soubor pro binární čtení, použije modul
+    compression.zstd (python 3.14+) nebo balíček zstandard"""
+    try:
+        from compression import zstd  # pylint: disable=import-outside-toplevel
+
+        return zstd.open(cesta, "rb")
+    except ImportError:
+        pass
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+    except ImportError as e:
+        raise ImportError(
+            "Pro čtení zstd je potřeba python 3.14 nebo balíček zstandard"
+        ) from e
+    return zstandard.ZstdDecompressor().stream_reader(open(cesta, "rb"), closefd=True)
+
+
+def otevri_zdroj(cesta: str, encoding: str = "utf8", newline: str = ""):
+    """otevře zdrojový soubor pro textové čtení, komprimovaný
+    soubor se rozbaluje proudově"""
+    komprese = zjisti_kompresi(cesta)
+    if komprese is None:
+        return open(cesta, "r", encoding=encoding, newline=newline)
+    if komprese == "gzip":
+        binarni = gzip.open(cesta, "rb")
+    elif komprese == "zstd":
+        binarni = _otevri_zstd(cesta)
+    else:
+        # otevřený soubor zůstane platný i po zavření archivu
+        with zipfile.ZipFile(cesta) as archiv:
+            soubory = [polozka for polozka in archiv.infolist() if not polozka.is_dir()]
+            if not soubory:
+                raise IOError(f"Archiv {cesta} je prázdný")
+            binarni = archiv.open(soubory[0])
+    return io.TextIOWrapper(binarni, encoding=encoding, newline=newline)
+
+
+def komprese_duckdb(cesta: str) -> str:
+    """vrátí hodnotu parametru compression pro duckdb read_csv,
+    zip duckdb neumí číst, proto vyvolá ValueError"""
+    komprese = zjisti_kompresi(cesta)
+    if komprese == "zip":
+        raise ValueError(f"Soubor {cesta} je zip, duckdb umí číst jen gzip a zstd")
+    return komprese or "none"
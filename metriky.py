@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""modul pro volitelné měření jednotlivých metod zpracování.
+
+Po zapnutí v config.py (METRIKY, případně PROFIL_SLOZKA) obalí
+veřejné metody třídy a pro každé volání zaznamená dobu běhu,
+počet řádků (zaznamená jej metoda přes zaznamenej_radky), přečtené
+a zapsané bajty a maximální paměť procesu.
+Záznamy se zapisují jako JSON řádky, nebo jako textový soubor
+pro Prometheus (node exporter textfile collector).
+"""
+
+import os
+import json
+import time
+import atexit
+import cProfile
+import inspect
+import types
+import functools
+from collections import defaultdict
+
+# zapisovače podle výstupního souboru, sdílí je všechny třídy v procesu
+_zapisovace = {}
+
+
+def _io_procesu():
+    """vrátí přečtené a zapsané bajty procesu (linux /proc),
+    jinde vrací None"""
+    try:
+        with open("/proc/self/io", "r", encoding="utf8") as soubor:
+            hodnoty = dict(radek.split(": ") for radek in soubor.read().splitlines())
+        return int(hodnoty["rchar"]), int(hodnoty["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _max_rss():
+    """maximální paměť procesu v bajtech (ru_maxrss je na linuxu v kB),
+    kde modul resource není (windows), vrací None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# atribut instance, do kterého měřená metoda zaznamená počet řádků
+_RADKY = "_metriky_radky"
+
+
+def zaznamenej_radky(instance, pocet: int) -> None:
+    """měřená metoda jím zaznamená počet skutečně zpracovaných
+    řádků, metody, které jej nezaznamenají, mají počet řádků null"""
+    setattr(instance, _RADKY, pocet)
+
+
+class ZapisovacJson:
+    """zapisuje každé volání jako jeden JSON řádek"""
+
+    def __init__(self, vystup):
+        self.vystup = vystup
+
+    def zapis(self, zaznam):
+        """připíše záznam na konec souboru"""
+        with open(self.vystup, "a", encoding="utf8") as soubor:
+            soubor.write(json.dumps(zaznam, ensure_ascii=False) + "\n")
+
+
+class ZapisovacPrometheus:
+    """sčítá záznamy a při ukončení procesu zapíše textový
+    soubor ve formátu Prometheus"""
+
+    def __init__(self, vystup):
+        self.vystup = vystup
+        self.hodnoty = defaultdict(float)
+        self.max_rss = 0
+        atexit.register(self.uloz)
+
+    def zapis(self, zaznam):
+        """přičte hodnoty záznamu k součtům metody"""
+        klic = (zaznam["trida"], zaznam["metoda"])
+        self.hodnoty[("db_metoda_volani_total", klic)] += 1
+        self.hodnoty[("db_metoda_sekundy_total", klic)] += zaznam["cas_s"]
+        for nazev, polozka in (
+            ("db_metoda_radky_total", "radky"),
+            ("db_metoda_precteno_bajtu_total", "precteno_b"),
+            ("db_metoda_zapsano_bajtu_total", "zapsano_b"),
+        ):
+            if zaznam[polozka] is not None:
+                self.hodnoty[(nazev, klic)] += zaznam[polozka]
+        if zaznam["max_rss_b"] is not None:
+            self.max_rss = max(self.max_rss, zaznam["max_rss_b"])
+
+    def uloz(self):
+        """zapíše soubor najednou (přes dočasný soubor a přejmenování)"""
+        radky = []
+        posledni = None
+        for (nazev, (trida, metoda)), hodnota in sorted(self.hodnoty.items()):
+            if nazev != posledni:
+                radky.append(f"# TYPE {nazev} counter")
+                posledni = nazev
+            radky.append(f'{nazev}{{trida="{trida}",metoda="{metoda}"}} {hodnota}')
+        # bez modulu resource se paměť neměří a metrika se nezapíše
+        if self.max_rss:
+            radky.append("# TYPE db_proces_max_rss_bajtu gauge")
+            radky.append(f"db_proces_max_rss_bajtu {self.max_rss}")
+        docasny = self.vystup + ".tmp"
+        with open(docasny, "w", encoding="utf8") as soubor:
+            soubor.write("\n".join(radky) + "\n")
+        os.replace(docasny, self.vystup)
+
+
+class ProfilTridy:
+    """jeden cProfile pro všechna volání metod třídy (etapy),
+    výsledek se uloží při ukončení procesu"""
+
+    def __init__(self, vystup):
+        self.vystup = vystup
+        self.profil = cProfile.Profile()
+        self.hloubka = 0
+        self.zapnuto = False
+        atexit.register(self.uloz)
+
+    def __enter__(self):
+        if self.hloubka == 0:
+            try:
+                self.profil.enable()
+                self.zapnuto = True
+            except ValueError:
+                # profiluje už jiná třída (vnořené volání)
+                self.zapnuto = False
+        self.hloubka += 1
+
+    def __exit__(self, *_):
+        self.hloubka -= 1
+        if self.hloubka == 0 and self.zapnuto:
+            self.profil.disable()
+
+    def uloz(self):
+        """uloží profil, lze jej prohlížet např. přes pstats nebo snakeviz"""
+        self.profil.dump_stats(self.vystup)
+
+
+def _obal(trida, nazev, metoda, zapisovac, profil):
+    """obalí metodu měřením"""
+
+    @functools.wraps(metoda)
+    def obalena(self, *argumenty, **pojmenovane):
+        io_pred = _io_procesu()
+        # počet řádků vnořeného volání se nezapočte do vnějšího
+        vnejsi_radky = getattr(self, _RADKY, None)
+        setattr(self, _RADKY, None)
+        zacatek = time.perf_counter()
+        try:
+            if profil:
+                with profil:
+                    vysledek = metoda(self, *argumenty, **pojmenovane)
+            else:
+                vysledek = metoda(self, *argumenty, **pojmenovane)
+        finally:
+            radky = getattr(self, _RADKY, None)
+            setattr(self, _RADKY, vnejsi_radky)
+        cas = time.perf_counter() - zacatek
+        if zapisovac:
+            io_po = _io_procesu()
+            zapisovac.zapis(
+                {
+                    "cas": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "trida": trida,
+                    "metoda": nazev,
+                    "cas_s": round(cas, 6),
+                    "radky": radky,
+                    "precteno_b": io_po[0] - io_pred[0] if io_pred else None,
+                    "zapsano_b": io_po[1] - io_pred[1] if io_pred else None,
+                    "max_rss_b": _max_rss(),
+                }
+            )
+        return vysledek
+
+    return obalena
+
+
+def _nastroje(nazev_tridy, nastaveni, slozka):
+    """vrátí zapisovač metrik a profil třídy podle nastavení,
+    (None, None), pokud měření ani profilování není zapnuté"""
+    vystup = getattr(nastaveni, "METRIKY", None)
+    slozka_profilu = getattr(nastaveni, "PROFIL_SLOZKA", None)
+
+    zapisovac = None
+    if vystup:
+        vystup = os.path.join(slozka, vystup)
+        if vystup not in _zapisovace:
+            if getattr(nastaveni, "FORMAT_METRIK", "json") == "prometheus":
+                _zapisovace[vystup] = ZapisovacPrometheus(vystup)
+            else:
+                _zapisovace[vystup] = ZapisovacJson(vystup)
+        zapisovac = _zapisovace[vystup]
+    profil = None
+    if slozka_profilu:
+        slozka_profilu = os.path.join(slozka, slozka_profilu)
+        os.makedirs(slozka_profilu, exist_ok=True)
+        profil = ProfilTridy(os.path.join(slozka_profilu, f"{nazev_tridy}.prof"))
+    return zapisovac, profil
+
+
+def _merene_metody(trida, vynechat):
+    """veřejné metody třídy (kromě generátorů a vynechaných)"""
+    for nazev, metoda in list(vars(trida).items()):
+        if (
+            nazev.startswith("_")
+            or nazev in vynechat
+            or not inspect.isfunction(metoda)
+            or inspect.isgeneratorfunction(metoda)
+        ):
+            continue
+        yield nazev, metoda
+
+
+def instrumentuj(trida, nastaveni, slozka, vynechat=()):
+    """pokud je v nastavení zapnuté měření nebo profilování,
+    obalí veřejné metody třídy (kromě generátorů)
+
+    Args:
+        trida: měřená třída
+        nastaveni: config datasetu (METRIKY, FORMAT_METRIK, PROFIL_SLOZKA)
+        slozka: složka datasetu, vůči ní se berou relativní cesty
+        vynechat: metody volané pro každou hodnotu, které se neměří
+    """
+    zapisovac, profil = _nastroje(trida.__name__, nastaveni, slozka)
+    if not zapisovac and not profil:
+        return trida
+    for nazev, metoda in _merene_metody(trida, vynechat):
+        setattr(trida, nazev, _obal(trida.__name__, nazev, metoda, zapisovac, profil))
+    return trida
+
+
+def instrumentuj_instanci(instance, nastaveni, slozka, vynechat=()):
+    """jako instrumentuj, ale obalí metody jen jedné instance,
+    takže každá instance (např. dataset v dávkovém importu)
+    může mít vlastní nastavení měření"""
+    trida = type(instance)
+    zapisovac, profil = _nastroje(trida.__name__, nastaveni, slozka)
+    if not zapisovac and not profil:
+        return instance
+    for nazev, metoda in _merene_metody(trida, vynechat):
+        obalena = _obal(trida.__name__, nazev, metoda, zapisovac, profil)
+        setattr(instance, nazev, types.MethodType(obalena, instance))
+    return instance
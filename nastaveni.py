@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""modul pro načtení konfigurace datasetu.
+
+Složku datasetu lze zvolit na příkazové řádce (--slozka),
+proměnnou prostředí SLOZKA, jinak se použije master_config.
+Config každé složky se načte jen jednou a uloží do cache.
+
+Použití v modulech:
+    from nastaveni import SLOZKA, config
+"""
+
+import os
+import sys
+import argparse
+import functools
+import importlib.util
+
+from master_config import SLOZKA as VYCHOZI_SLOZKA
+
+CESTA = os.path.dirname(os.path.abspath(__file__))
+
+
+@functools.cache
+def zvolena_slozka():
+    """vrátí složku datasetu zvolenou na příkazové řádce,
+    v proměnné prostředí SLOZKA nebo v master_config"""
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--slozka")
+    argumenty, _ = parser.parse_known_args(sys.argv[1:])
+    return argumenty.slozka or os.environ.get("SLOZKA") or VYCHOZI_SLOZKA
+
+
+@functools.cache
+def nacti_config(slozka):
+    """načte config.py zadaného datasetu"""
+    cesta_k_modulu = os.path.join(CESTA, slozka, "config.py")
+    spec = importlib.util.spec_from_file_location("config", cesta_k_modulu)
+    config = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(config)
+    return config
+
+
+def __getattr__(nazev):
+    """SLOZKA a config se vyhodnotí až při prvním použití"""
+    if nazev == "SLOZKA":
+        return zvolena_slozka()
+    if nazev == "config":
+        return nacti_config(zvolena_slozka())
+    raise AttributeError(f"module {__name__!r} has no attribute {nazev!r}")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""modul spojuje opravu dat a import do databáze
+duckdb, opravené řádky se nahrávají přímo po dávkách
+bez zápisu dočasného souboru tmp.csv. Při nastavení
+OPRAVA_V_DATABAZI provede opravu hodnot přímo duckdb"""
+
+import logging
+
+from opravar_dat import OpravarDat, priprav_proudove, config
+from importer_dat import ImporterDat
+
+
+def main():
+    """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
+    fmt = "%(asctime)s: %(message)s"
+    logging.basicConfig(format=fmt, level=logging.INFO, datefmt="%H:%M:%S")
+
+    logging.info("Spuštění skriptu")
+
+    opravar_dat = OpravarDat()
+    priprav_proudove(opravar_dat)
+
+    importer_dat = ImporterDat()
+    importer_dat.pripoj_se_k_databazi()
+
+    if getattr(config, "OPRAVA_V_DATABAZI", False):
+        importer_dat.nahraj_data_sql(opravar_dat.vytvor_prikaz_opravy_sql())
+        importer_dat.serad_tabulku()
+        importer_dat.vytvor_indexy()
+        importer_dat.vytvor_agregace()
+        importer_dat.zvys_generaci()
+        importer_dat.odpoj_se_od_databaze()
+        logging.info("Ukončení skriptu")
+        return
+
+    importer_dat.nacti_prikaz_create()
+    importer_dat.nahraj_davky(
+        opravar_dat.davky_arrow(opravar_dat.opravene_radky())
+    )
+    importer_dat.serad_tabulku()
+    importer_dat.vytvor_indexy()
+    importer_dat.vytvor_agregace()
+    importer_dat.zvys_generaci()
+    importer_dat.odpoj_se_od_databaze()
+
+    opravar_dat.zkontroluj_proudova_data()
+
+    logging.info("Ukončení skriptu")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,24 +3,88 @@
 pro import do databáze duckdb
 """
 
+import io
+import re
 import csv
 import os
+import functools
 import logging
-from datetime import datetime
-import importlib.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from decimal import ROUND_HALF_UP, Context, Decimal, InvalidOperation
+from itertools import islice
 
 from typing import Any
 
 from uprava_nazvu import zjisti_nazvy_sloupcu
-from master_config import SLOZKA
+from komprese import otevri_zdroj, zjisti_kompresi, komprese_duckdb
+from useky_souboru import rozdel_soubor_na_useky, precti_usek
+from prevod_datumu import PrevodnikDatumu
+from nastaveni import SLOZKA, config
+from metriky import instrumentuj, zaznamenej_radky
 
-# vytvoř absolutní cestu k modulu config.py
-cesta_k_modulu = os.path.join(os.path.dirname(__file__), SLOZKA, "config.py")
+# rozsahy celočíselných typů duckdb (nejmenší a největší hodnota)
+ROZSAHY = {
+    "integer": (-(2**31), 2**31 - 1),
+    "bigint": (-(2**63), 2**63 - 1),
+    "hugeint": (-(2**127), 2**127 - 1),
+}
+# přesnost zaokrouhlení při kontrole čísel (hugeint má 39 číslic)
+KONTEXT_CISEL = Context(prec=100)
+# podtržítko, které neodděluje číslice (duckdb přijme jen 1_000)
+PODTRZITKO = re.compile(r"(?<![0-9])_|_(?![0-9])")
+PODTRZITKO_SESTNACTKOVE = re.compile(r"(?<![0-9a-fA-F])_|_(?![0-9a-fA-F])")
+# čas ve tvaru HH:MM[:SS[.f]], který duckdb převede na time, mezery
+# duckdb přijme před časem, za ním jen po sekundách
+CAS = re.compile(r"\s*(\d{1,2}):(\d{1,2})(?::(\d{1,2})(?:\.\d+)?\s*)?", re.ASCII)
+# texty, které duckdb převede na boolean
+PRAVDIVOSTNI = {"true", "false", "t", "f", "yes", "no", "y", "n", "1", "0"}
 
-# vytvoř import spec
-spec = importlib.util.spec_from_file_location("config", cesta_k_modulu)
-config = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(config)
+
+def _je_cislo(hodnota: str, dolni, horni, meritko: int = 0, cele=False) -> bool:
+    """ověří, že text duckdb převede na číslo v rozsahu typu, hodnota
+    se před kontrolou rozsahu zaokrouhlí na počet desetinných míst
+    typu stejně jako v duckdb, celá čísla mohou být i šestnáctková
+    (0x) nebo dvojková (0b)"""
+    # Decimal přijme i číslice jiných písem, duckdb jen ascii
+    if not hodnota.isascii():
+        return False
+    text = hodnota.strip()
+    try:
+        if cele and text[:2].lower() in ("0x", "0b"):
+            # int přijme i podtržítko hned za 0x
+            if PODTRZITKO_SESTNACTKOVE.search(text[2:]):
+                return False
+            cislo = Decimal(int(text, 0))
+        else:
+            # Decimal přijme podtržítka kdekoli
+            if PODTRZITKO.search(text):
+                return False
+            cislo = Decimal(text).quantize(
+                Decimal(1).scaleb(-meritko),
+                rounding=ROUND_HALF_UP,
+                context=KONTEXT_CISEL,
+            )
+    except (ValueError, InvalidOperation):
+        return False
+    return cislo.is_finite() and dolni <= cislo <= horni
+
+
+def _je_cas(hodnota: str) -> bool:
+    """ověří, že text je čas ve tvaru HH:MM[:SS[.f]],
+    duckdb přijme i 24:00:00"""
+    shoda = CAS.fullmatch(hodnota)
+    if not shoda:
+        return False
+    hodiny, minuty, sekundy = (int(cast or 0) for cast in shoda.groups())
+    if hodiny == 24:
+        return minuty == sekundy == 0
+    return hodiny < 24 and minuty < 60 and sekundy < 60
+
+
+def _je_pravdivostni(hodnota: str) -> bool:
+    """ověří, že text lze převést na boolean"""
+    return hodnota.strip().lower() in PRAVDIVOSTNI
 
 
 class OpravarDat:
@@ -38,26 +102,82 @@ class OpravarDat:
         self.data = []
         self.hlavicka = []
         self.hlavicka_opravena = []
+        # přepsání upravených názvů sloupců (viz uprava_nazvu)
+        self.prejmenovani = getattr(config, "PREJMENOVANI_SLOUPCU", None)
         self.retezec = ""
         self.hodnoty = ""
         self.prikaz_create = ""
         self.sloupce_a_typy = []
         self.meritka = []
         self.datumy = []
+        # proudové zpracování - počet řádků zapsaných najednou
+        self.proudove = getattr(config, "PROUDOVE", False)
+        self.velikost_bufferu = getattr(config, "VELIKOST_BUFFERU", 10000)
+        # formát předávacího souboru pro import: "csv" (text),
+        # "parquet" nebo "arrow" (arrow ipc) s typy podle hlavičky
+        self.format_predani = getattr(config, "FORMAT_PREDANI", "csv")
+        # kontrola každého řádku podle typů z hlavičky, chybné řádky
+        # se i s důvodem zapíšou do souboru odmítnutých
+        self.validace = getattr(config, "VALIDACE", False)
+        self.odmitnute = os.path.join(
+            self.cesta, SLOZKA, getattr(config, "ODMITNUTE", "odmitnute.csv")
+        )
+        self.kontroly = []
+        self.pocet_odmitnutych = 0
+        # paralelní oprava úseků souboru v procesech (jen nekomprimovaný
+        # zdroj, předání přes csv a bez validace)
+        self.komprese = zjisti_kompresi(self.vstup)
+        self.paralelne = (
+            getattr(config, "PARALELNI_OPRAVA", False)
+            and not self.komprese
+            and self.format_predani == "csv"
+            and not self.validace
+        )
+        self.pocet_procesu = getattr(config, "POCET_PROCESU", None)
+        self.velikost_useku = int(getattr(config, "VELIKOST_USEKU_MB", 64) * 1024**2)
+        self.radky = None
+        self.pocet_radku = 0
+        self.pocty_sloupcu = set()
+        self.prevodnik = PrevodnikDatumu(
+            formaty=["%d.%m.%Y %H:%M:%S", "%d.%m.%Y"],
+            vystupni_format="%Y-%m-%d %H:%M:%S",
+            velikost_cache=getattr(config, "VELIKOST_CACHE_DATUMU", 100000),
+        )
 
     def nacti_data(self):
         """Načte data ze zdrojového CSV souboru."""
         try:
-            with open(self.vstup, "r+", newline="", encoding="utf8") as soubor:
+            with otevri_zdroj(self.vstup) as soubor:
                 cteni = csv.reader(
                     soubor, delimiter=self.oddelovac, quotechar=self.uvozovky
                 )
                 for row in cteni:
                     self.data.append(row)
+                zaznamenej_radky(self, len(self.data))
                 logging.info("Načtení dat dokončeno")
         except IOError as e:
             logging.info("Soubor s daty neexistuje %s", e)
 
+    def cti_data(self):
+        """Postupně čte řádky ze zdrojového CSV souboru,
+        celý soubor se nenačítá do paměti."""
+        with otevri_zdroj(self.vstup) as soubor:
+            cteni = csv.reader(
+                soubor, delimiter=self.oddelovac, quotechar=self.uvozovky
+            )
+            yield from cteni
+
+    def otevri_data(self):
+        """otevře zdrojový soubor pro proudové čtení
+        a oddělí hlavičku"""
+        self.radky = self.cti_data()
+        try:
+            self.hlavicka = next(self.radky)
+        except StopIteration:
+            logging.info("Soubor s daty je prázdný")
+        except IOError as e:
+            logging.info("Soubor s daty neexistuje %s", e)
+
     def zkontroluj_data(self):
         """zkontroluj délku a podobu dat"""
         logging.info("Řádků: %s, Sloupců: %s", len(self.data), len(self.data[0]))
@@ -103,28 +223,274 @@ class OpravarDat:
             for zaznam in self.data:
                 zaznam[i] = zaznam[i].replace(",", ".")
 
-    def oprav_datum(self, hodnota):
+    def oprav_datum(self, hodnota, sloupec=None):
         """
-        Převede hodnoty ve sloupci 'datum' na datetime.datetime.
+        Převede hodnoty ve sloupci 'datum' na text pro import do duckdb.
         Podporuje 'DD.MM.YYYY' i 'DD.MM.YYYY HH:MM:SS'.
         """
-        vsl = None
         if hodnota == "":
-            return vsl
-        if ":" in hodnota:
-            tmp = datetime.strptime(hodnota, "%d.%m.%Y %H:%M:%S")
-            vsl = tmp.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            # Pokud selže, zkusit pouze datum
-            tmp = datetime.strptime(hodnota, "%d.%m.%Y")
-            vsl = tmp.strftime("%Y-%m-%d") + " 00:00:00"
-        return vsl
+            return None
+        return self.prevodnik.preved(hodnota, sloupec)
+
+    def oprav_radek(self, zaznam):
+        """opraví desetinné oddělovače a datumy v jednom řádku"""
+        for i in self.meritka:
+            zaznam[i] = zaznam[i].replace(",", ".")
+        for i in self.datumy:
+            zaznam[i] = self.oprav_datum(zaznam[i], i)
+        return zaznam
+
+    def opravene_radky(self):
+        """generátor opravených řádků, zároveň sbírá
+        údaje pro kontrolu dat"""
+        if self.validace:
+            yield from self.overene_radky()
+            return
+        for zaznam in self.radky:
+            self.pocet_radku += 1
+            self.pocty_sloupcu.add(len(zaznam))
+            yield self.oprav_radek(zaznam)
+
+    def priprav_kontroly(self):
+        """sestaví kontroly hodnot podle datových typů sloupců,
+        text se nekontroluje a datumy ověří už jejich oprava"""
+        self.kontroly = []
+        for i, typ in enumerate(self.typy_sloupcu()):
+            zaklad = typ.split("(")[0].strip().lower()
+            if zaklad in ROZSAHY:
+                dolni, horni = ROZSAHY[zaklad]
+                # zápis 0x a 0b duckdb u hugeint nepřevede
+                kontrola = functools.partial(
+                    _je_cislo, dolni=dolni, horni=horni, cele=zaklad != "hugeint"
+                )
+            elif zaklad == "decimal":
+                presnost, meritko = (
+                    int(cast)
+                    for cast in typ[typ.index("(") + 1 : typ.index(")")].split(",")
+                )
+                # největší hodnota, např. 999999999999999.999 pro decimal(18, 3)
+                horni = Decimal(10) ** (presnost - meritko) - Decimal(10) ** -meritko
+                kontrola = functools.partial(
+                    _je_cislo, dolni=-horni, horni=horni, meritko=meritko
+                )
+            elif zaklad == "boolean":
+                kontrola = _je_pravdivostni
+            elif zaklad == "time":
+                kontrola = _je_cas
+            else:
+                continue
+            self.kontroly.append((i, typ, kontrola))
+
+    def oprav_a_zkontroluj_radek(self, zaznam):
+        """opraví řádek a ověří jeho hodnoty, vrátí důvod
+        odmítnutí, nebo None pro správný řádek"""
+        if len(zaznam) != len(self.hlavicka_opravena):
+            return (
+                f"Počet sloupců {len(zaznam)}, "
+                f"očekáváno {len(self.hlavicka_opravena)}"
+            )
+        try:
+            self.oprav_radek(zaznam)
+        except ValueError as e:
+            return str(e)
+        for i, typ, kontrola in self.kontroly:
+            if zaznam[i] and not kontrola(zaznam[i]):
+                return (
+                    f"Hodnota '{zaznam[i]}' ve sloupci "
+                    f"{self.hlavicka_opravena[i]} neodpovídá typu {typ}"
+                )
+        return None
+
+    def overene_radky(self):
+        """generátor opravených a ověřených řádků, chybné řádky
+        zapíše i s pořadím záznamu a důvodem do souboru odmítnutých
+        a pokračuje dál, import tak neskončí až chybou v copy"""
+        self.priprav_kontroly()
+        with open(self.odmitnute, "w", encoding="utf-8") as soubor:
+            w = csv.writer(soubor, delimiter=";", quotechar='"', lineterminator="\n")
+            w.writerow(["zaznam", "duvod", *self.hlavicka])
+            for zaznam in self.radky:
+                self.pocet_radku += 1
+                self.pocty_sloupcu.add(len(zaznam))
+                puvodni = list(zaznam)
+                duvod = self.oprav_a_zkontroluj_radek(zaznam)
+                if duvod:
+                    self.pocet_odmitnutych += 1
+                    w.writerow([self.pocet_radku, duvod, *puvodni])
+                    continue
+                yield zaznam
+
+    def davky_arrow(self, radky):
+        """seskupí opravené řádky do arrow dávek o velikosti
+        velikost_bufferu, prázdné hodnoty převede na null
+        (stejně jako copy z csv)"""
+        import pyarrow
+
+        while True:
+            buffer = list(islice(radky, self.velikost_bufferu))
+            if not buffer:
+                break
+            sloupce = [
+                pyarrow.array(
+                    [zaznam[i] or None for zaznam in buffer], type=pyarrow.string()
+                )
+                for i in range(len(self.hlavicka_opravena))
+            ]
+            yield pyarrow.RecordBatch.from_arrays(
+                sloupce, names=self.hlavicka_opravena
+            )
+
+    def typy_sloupcu(self):
+        """datové typy sloupců podle příkazu create v hlavičce"""
+        return [" ".join(sloupec[1:]).rstrip(",") for sloupec in self.sloupce_a_typy]
+
+    def uloz_data_typovane(self, vystup: str, radky) -> None:
+        """Metoda postupně uloží opravené řádky do souboru parquet
+        nebo arrow ipc se sloupci typovanými podle hlavičky, hodnoty
+        přetypuje duckdb stejně jako při importu z csv
+
+        Args:
+            vystup: str - cesta k souboru
+            radky: iterátor opravených řádků (bez hlavičky)
+
+        Return:
+            None
+        """
+        import duckdb
+        import pyarrow
+        import pyarrow.ipc
+
+        schema = pyarrow.schema(
+            [(nazev, pyarrow.string()) for nazev in self.hlavicka_opravena]
+        )
+        ctenar = pyarrow.RecordBatchReader.from_batches(schema, self.davky_arrow(radky))
+        vyrazy = ", ".join(
+            f"cast({nazev} as {typ}) as {nazev}"
+            for nazev, typ in zip(self.hlavicka_opravena, self.typy_sloupcu())
+        )
+        dotaz = f"select {vyrazy} from radky"
+        with duckdb.connect() as pripojeni:
+            pripojeni.register("radky", ctenar)
+            if self.format_predani == "parquet":
+                pripojeni.execute(
+                    f"copy ({dotaz}) to '{vystup}' (format parquet, compression zstd)"
+                )
+            elif self.format_predani == "arrow":
+                typovane = pripojeni.execute(dotaz).fetch_record_batch(
+                    self.velikost_bufferu
+                )
+                with pyarrow.ipc.new_file(
+                    vystup,
+                    typovane.schema,
+                    options=pyarrow.ipc.IpcWriteOptions(compression="zstd"),
+                ) as zapis:
+                    for davka in typovane:
+                        zapis.write_batch(davka)
+            else:
+                raise ValueError(f"Neznámý formát předání: '{self.format_predani}'")
+        zaznamenej_radky(self, self.pocet_radku - self.pocet_odmitnutych)
+        logging.info("Data uložena ve formátu %s", self.format_predani)
+
+    def rozdel_soubor_na_useky(self):
+        """rozdělí soubor (bez hlavičky) na bajtové úseky, které
+        začínají i končí na hranici řádku mimo text v uvozovkách"""
+        return rozdel_soubor_na_useky(self.vstup, self.velikost_useku, self.uvozovky)
+
+    def oprav_usek(self, zacatek: int, konec: int):
+        """opraví řádky v bajtovém úseku souboru a vrátí je jako
+        text csv, počet řádků a nalezené počty sloupců"""
+        cteni = csv.reader(
+            io.StringIO(precti_usek(self.vstup, zacatek, konec), newline=""),
+            delimiter=self.oddelovac,
+            quotechar=self.uvozovky,
+        )
+        vystup = io.StringIO()
+        w = csv.writer(vystup, delimiter=";", quotechar='"', lineterminator="\n")
+        pocet_radku = 0
+        pocty_sloupcu = set()
+        for zaznam in cteni:
+            pocet_radku += 1
+            pocty_sloupcu.add(len(zaznam))
+            w.writerow(self.oprav_radek(zaznam))
+        return vystup.getvalue(), pocet_radku, pocty_sloupcu
+
+    def uloz_data_paralelne(self, vystup: str) -> None:
+        """opraví úseky souboru souběžně v procesech a zapíše je
+        ve stejném pořadí, výstup je totožný s proudovým zpracováním"""
+        useky = self.rozdel_soubor_na_useky()
+        pocet_procesu = self.pocet_procesu or os.cpu_count() or 1
+        logging.info("Opravuji %s úseků v %s procesech", len(useky), pocet_procesu)
+        with ProcessPoolExecutor(
+            max_workers=pocet_procesu,
+            initializer=_priprav_proces,
+            initargs=(self.meritka, self.datumy),
+        ) as pool, open(vystup, "w", encoding="utf-8") as soubor:
+            csv.writer(
+                soubor, delimiter=";", quotechar='"', lineterminator="\n"
+            ).writerow(self.hlavicka_opravena)
+            # rozpracováno je nejvýše dvakrát tolik úseků než procesů
+            fronta = deque()
+            useky = iter(useky)
+            for zacatek, konec in islice(useky, 2 * pocet_procesu):
+                fronta.append(pool.submit(_oprav_usek, zacatek, konec))
+            while fronta:
+                text, pocet_radku, pocty_sloupcu = fronta.popleft().result()
+                for zacatek, konec in islice(useky, 1):
+                    fronta.append(pool.submit(_oprav_usek, zacatek, konec))
+                soubor.write(text)
+                self.pocet_radku += pocet_radku
+                self.pocty_sloupcu |= pocty_sloupcu
+        zaznamenej_radky(self, self.pocet_radku)
+        logging.info("Paralelní zpracování dokončeno")
+
+    def zkontroluj_proudova_data(self):
+        """zkontroluj délku a podobu dat po proudovém zpracování"""
+        logging.info(
+            "Řádků: %s, Sloupců: %s", self.pocet_radku + 1, len(self.hlavicka)
+        )
+        logging.info("Kontrola sloupců, jen jedna hodnota: %s", self.pocty_sloupcu)
+        if self.validace:
+            logging.info(
+                "Odmítnuto řádků: %s (%s)", self.pocet_odmitnutych, self.odmitnute
+            )
 
     def vymen_oravene_datum(self):
         """Nahradí formát datumu pro import do duckdb"""
         for i in self.datumy:
             for zaznam in self.data:
-                zaznam[i] = self.oprav_datum(zaznam[i])
+                zaznam[i] = self.oprav_datum(zaznam[i], i)
+
+    def vytvor_prikaz_opravy_sql(self):
+        """sestaví příkaz create table as select, který načte
+        zdrojový soubor jako text a opraví desetinné oddělovače
+        a datumy přímo v databázi duckdb"""
+        meritka = set(self.meritka)
+        datumy = set(self.datumy)
+        vyrazy = []
+        for i, nazev in enumerate(self.hlavicka_opravena):
+            typ = " ".join(self.sloupce_a_typy[i][1:]).rstrip(",")
+            if i in meritka:
+                vyraz = f"replace({nazev}, ',', '.')"
+            elif i in datumy:
+                vyraz = (
+                    f"case when contains({nazev}, ':') "
+                    f"then strptime({nazev}, '%d.%m.%Y %H:%M:%S') "
+                    f"else strptime({nazev}, '%d.%m.%Y') end"
+                )
+            else:
+                vyraz = nazev
+            vyrazy.append(f"cast({vyraz} as {typ}) as {nazev}")
+        nazvy = ", ".join(f"'{nazev}'" for nazev in self.hlavicka_opravena)
+        uvozovky = self.uvozovky or ""
+        sloupce = ",\n    ".join(vyrazy)
+        return (
+            f"create or replace table {self.tabulka} as\n"
+            f"select\n    {sloupce}\n"
+            f"from read_csv('{self.vstup}',\n"
+            f"    delim='{self.oddelovac}', quote='{uvozovky}', header=true,\n"
+            f"    all_varchar=true, names=[{nazvy}],\n"
+            f"    compression='{komprese_duckdb(self.vstup)}')"
+        )
 
     def sjednot_data_a_hlavicku(self):
         """sloupci pro následné uložení hlavička a data"""
@@ -154,11 +520,98 @@ class OpravarDat:
                     )
                     for ity in data:
                         w.writerow(ity)
+                zaznamenej_radky(self, len(data))
             except IOError:
                 logging.info("Nezdařilo se zapsat do souboru")
         else:
             logging.info("Data pro zápis neexistují")
 
+    def uloz_data_proudove(
+        self, vystup: str, radky, oddelovac: str, uvozovky: str = None
+    ) -> None:
+        """Metoda postupně uloží hlavičku a řádky z generátoru
+        do CSV souboru, v paměti drží nejvýše velikost_bufferu řádků
+
+        Args:
+            vystup: str - cesta k souboru
+            radky: iterátor řádků (bez hlavičky)
+            oddelovac: str
+            uvozovky: str
+
+        Return:
+            None
+        """
+        try:
+            with open(vystup, "w", encoding="utf-8") as soubor:
+                w = csv.writer(
+                    soubor,
+                    delimiter=oddelovac,
+                    quotechar=uvozovky,
+                    lineterminator="\n",
+                )
+                w.writerow(self.hlavicka_opravena)
+                pocet = 0
+                while True:
+                    buffer = list(islice(radky, self.velikost_bufferu))
+                    if not buffer:
+                        break
+                    w.writerows(buffer)
+                    pocet += len(buffer)
+            zaznamenej_radky(self, pocet)
+            logging.info("Proudové zpracování dokončeno")
+        except IOError:
+            logging.info("Nezdařilo se zapsat do souboru")
+
+
+instrumentuj(
+    OpravarDat,
+    config,
+    os.path.join(os.path.dirname(__file__), SLOZKA),
+    vynechat=("oprav_datum", "oprav_radek", "oprav_a_zkontroluj_radek"),
+)
+
+
+# opravář dat v procesu paralelní opravy
+_OPRAVAR = None
+
+
+def _priprav_proces(meritka, datumy):
+    """připraví opravář v nově spuštěném procesu"""
+    global _OPRAVAR  # pylint: disable=global-statement
+    _OPRAVAR = OpravarDat()
+    _OPRAVAR.meritka = meritka
+    _OPRAVAR.datumy = datumy
+
+
+def _oprav_usek(zacatek: int, konec: int):
+    """oprava jednoho úseku souboru v samostatném procesu"""
+    return _OPRAVAR.oprav_usek(zacatek, konec)
+
+
+def priprav_proudove(opravar_dat):
+    """otevře zdroj pro proudové čtení a zjistí sloupce k opravě"""
+    opravar_dat.otevri_data()
+    opravar_dat.hlavicka_opravena = zjisti_nazvy_sloupcu(
+        opravar_dat.hlavicka, opravar_dat.prejmenovani
+    )
+    opravar_dat.nacti_prikaz_create()
+    opravar_dat.zpracuj_prikaz_create()
+    opravar_dat.meritka = opravar_dat.zjisti_sloupce_podle_typu(["decimal"])
+    opravar_dat.datumy = opravar_dat.zjisti_sloupce_podle_typu(["date", "timestamp"])
+
+
+def zpracuj_proudove(opravar_dat):
+    """opraví data po řádcích bez načtení celého souboru do paměti,
+    výstup je totožný s dávkovým zpracováním"""
+    priprav_proudove(opravar_dat)
+    opravar_dat.uloz_data_proudove(
+        os.path.join(opravar_dat.cesta, SLOZKA, "tmp.csv"),
+        opravar_dat.opravene_radky(),
+        ";",
+        '"',
+    )
+    opravar_dat.zkontroluj_proudova_data()
+
 
 def main():
     """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
@@ -168,10 +621,36 @@ def main():
     logging.info("Spuštění skriptu")
 
     opravar_dat = OpravarDat()
+    if opravar_dat.format_predani != "csv":
+        priprav_proudove(opravar_dat)
+        opravar_dat.uloz_data_typovane(
+            os.path.join(
+                opravar_dat.cesta, SLOZKA, f"tmp.{opravar_dat.format_predani}"
+            ),
+            opravar_dat.opravene_radky(),
+        )
+        opravar_dat.zkontroluj_proudova_data()
+        logging.info("Ukončení skriptu")
+        return
+    if opravar_dat.paralelne:
+        priprav_proudove(opravar_dat)
+        opravar_dat.uloz_data_paralelne(
+            os.path.join(opravar_dat.cesta, SLOZKA, "tmp.csv")
+        )
+        opravar_dat.zkontroluj_proudova_data()
+        logging.info("Ukončení skriptu")
+        return
+    if opravar_dat.proudove or opravar_dat.validace:
+        zpracuj_proudove(opravar_dat)
+        logging.info("Ukončení skriptu")
+        return
+
     opravar_dat.nacti_data()
     opravar_dat.zkontroluj_data()
     opravar_dat.rozdel_data()
-    opravar_dat.hlavicka_opravena = zjisti_nazvy_sloupcu(opravar_dat.hlavicka)
+    opravar_dat.hlavicka_opravena = zjisti_nazvy_sloupcu(
+        opravar_dat.hlavicka, opravar_dat.prejmenovani
+    )
     opravar_dat.nacti_prikaz_create()
     opravar_dat.zpracuj_prikaz_create()
     opravar_dat.meritka = opravar_dat.zjisti_sloupce_podle_typu(["decimal"])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+
+"""modul pro převod textu na datum s pamětí
+naposledy úspěšného formátu pro každý sloupec"""
+
+from collections import OrderedDict
+from datetime import datetime
+
+FORMATY = [
+    "%d.%m.%Y %H:%M:%S",  # 30.06.2025 14:30:00
+    "%d.%m.%Y %H:%M",  # 30.06.2025 14:30
+    "%d.%m.%Y",  # 30.06.2025
+    "%d.%m.%y",  # 30.06.25
+    "%d/%m/%Y %H:%M:%S",  # 30/06/2025 14:30:00
+    "%d/%m/%Y %H:%M",  # 30/06/2025 14:30
+    "%d/%m/%Y",  # 30/06/2025
+    "%Y-%m-%d %H:%M:%S",  # 2025-06-30 14:30:00
+    "%Y-%m-%d %H:%M",  # 2025-06-30 14:30
+    "%Y-%m-%d",  # 2025-06-30
+    "%d %b %Y %H:%M",  # 30 Jun 2025 14:30
+    "%d %B %Y %H:%M",  # 30 June 2025 14:30
+    "%d %b %Y",  # 30 Jun 2025
+    "%d %B %Y",  # 30 June 2025
+]
+
+
+class PrevodnikDatumu:
+    """Převádí textové hodnoty na datetime. Pro každý sloupec
+    si pamatuje formát, který naposledy uspěl, a zkouší ho
+    jako první. Výsledky drží v omezené LRU cache."""
+
+    def __init__(self, formaty=None, vystupni_format=None, velikost_cache=100000):
+        self.formaty = list(formaty or FORMATY)
+        self.vystupni_format = vystupni_format
+        self.velikost_cache = velikost_cache
+        self.cache = OrderedDict()
+        self.posledni = {}  # sloupec -> naposledy úspěšný formát
+
+    def preved(self, hodnota: str, sloupec=None):
+        """převede hodnotu na datetime, případně na text
+        ve výstupním formátu, neúspěch vyvolá ValueError"""
+        if hodnota in self.cache:
+            self.cache.move_to_end(hodnota)
+            vysledek = self.cache[hodnota]
+        else:
+            vysledek = self._zkus_formaty(hodnota, sloupec)
+            self.cache[hodnota] = vysledek
+            if len(self.cache) > self.velikost_cache:
+                self.cache.popitem(last=False)
+        if vysledek is None:
+            raise ValueError(f"Nepodařilo se rozpoznat formát data: '{hodnota}'")
+        return vysledek
+
+    def _zkus_formaty(self, hodnota: str, sloupec):
+        """zkusí naposledy úspěšný formát sloupce a pak ostatní"""
+        posledni = self.posledni.get(sloupec)
+        poradi = self.formaty
+        if posledni is not None:
+            poradi = [posledni] + [fmt for fmt in self.formaty if fmt != posledni]
+        for fmt in poradi:
+            try:
+                tmp = datetime.strptime(hodnota, fmt)
+            except ValueError:
+                continue
+            self.posledni[sloupec] = fmt
+            if self.vystupni_format:
+                return tmp.strftime(self.vystupni_format)
+            return tmp
+        return None
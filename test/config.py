@@ -8,3 +8,76 @@ HLAVICKA = "hlavicka.txt"
 ODDELOVAC = ";"
 UVOZOVKY = None
 TABULKA = "t"
+
+# přejmenování upravených názvů sloupců (doplňuje výchozí
+# {"index": "ix", "key2": "neco"} v uprava_nazvu)
+PREJMENOVANI_SLOUPCU = {}
+
+# proudové zpracování v opravar_dat (nenačítá celý soubor do paměti)
+PROUDOVE = False
+VELIKOST_BUFFERU = 10000
+# paralelní oprava úseků souboru (počet procesů viz POCET_PROCESU)
+PARALELNI_OPRAVA = False
+VELIKOST_USEKU_MB = 64
+# formát předávacího souboru mezi opravou a importem
+# ("csv", "parquet" nebo "arrow" - typované podle hlavičky)
+FORMAT_PREDANI = "csv"
+# kontrola řádků podle typů z hlavičky při proudové opravě,
+# chybné řádky se i s důvodem zapíšou do souboru ODMITNUTE
+VALIDACE = False
+ODMITNUTE = "odmitnute.csv"
+
+# oprava desetinných čárek a datumů přímo v duckdb (oprav_a_nahraj)
+OPRAVA_V_DATABAZI = False
+
+# odhad datových typů v tvurce_sql (počet řádků vzorku,
+# paralelní průchod celým souborem a počet procesů)
+VZOREK = 1000
+PARALELNI_INFERENCE = False
+POCET_PROCESU = None
+# odhad typů v "python" nebo "duckdb" (sniff_csv), pro duckdb
+# formáty datumů a desetinný oddělovač zdrojových dat
+INFERENCE = "python"
+FORMAT_DATUMU = "%d.%m.%Y"
+FORMAT_CASU = "%d.%m.%Y %H:%M:%S"
+DESETINNY_ODDELOVAC = ","
+
+# velikost cache převedených datumů (tvurce_sql i opravar_dat)
+VELIKOST_CACHE_DATUMU = 100000
+
+# režim importu v importer_dat: "nahradit", "pripojit" (podle
+# maxima sloupce VODOZNAK) nebo "oddily" (podle KLICOVE_SLOUPCE)
+REZIM_IMPORTU = "nahradit"
+VODOZNAK = "datum"
+KLICOVE_SLOUPCE = ["datum"]
+
+# agregační tabulky obnovované po importu, vyberci_dat z nich
+# počítá odpovídající dotazy, např. {"t_podle_nazvu": {"dimenze":
+# ["nazev"], "miry": {"mer": ["sum", "avg"]}}} (viz agregace.py)
+AGREGACE = {}
+
+# seřazení řádků při importu (pro přeskakování skupin řádků při
+# filtrech podle rozsahu), indexy {"nazev": ["sloupce"]} a primární klíč
+SERAZENI = []
+INDEXY = {}
+PRIMARNI_KLIC = []
+
+# cache výsledků dotazů ve vyberci_dat (parquet ve složce cache)
+CACHE_DOTAZU = False
+VELIKOST_CACHE_MB = 512
+
+# formát exportu ve vyberci_dat: "xlsx", "csv", "parquet" (volitelně
+# rozdělený podle sloupce ROZDELIT_PODLE) nebo "arrow",
+# VELIKOST_DAVKY je počet řádků načítaných najednou
+FORMAT_EXPORTU = "xlsx"
+ROZDELIT_PODLE = None
+VELIKOST_DAVKY = 100000
+# počet dotazů ve vyberci_dat prováděných souběžně na kurzorech
+# jednoho připojení (1 = postupně), export běží souběžně s dotazy
+SOUBEZNE_DOTAZY = 1
+
+# měření metod (metriky.py): soubor s metrikami, formát "json"
+# nebo "prometheus" a složka pro cProfile výstupy jednotlivých tříd
+METRIKY = None
+FORMAT_METRIK = "json"
+PROFIL_SLOZKA = None
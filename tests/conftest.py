@@ -0,0 +1,8 @@
+"""společné nastavení testů, moduly načtou config
+testovacího datasetu ve složce test"""
+
+import os
+import sys
+
+os.environ.setdefault("SLOZKA", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,21 @@
+"""testy zápisu sešitu v export_xlsx"""
+
+import os
+
+import openpyxl
+
+from export_xlsx import ExportXlsx
+
+SABLONA = os.path.join(os.path.dirname(os.path.dirname(__file__)), "sablona.xlsx")
+
+
+def test_stejne_nazvy_listu_se_rozlisi(tmp_path):
+    vystup = tmp_path / "vysledek.xlsx"
+    export = ExportXlsx(SABLONA, str(vystup))
+    for nazev in ["a/b", "a_b", "A_B", "x" * 40, "X" * 35]:
+        export.pridej_list(nazev).zapis_radek(["hodnota"])
+    export.uloz()
+
+    nazvy = openpyxl.load_workbook(vystup).sheetnames
+    assert nazvy == ["a_b", "a_b_2", "A_B_3", "x" * 31, "X" * 29 + "_2"]
+    assert len({nazev.lower() for nazev in nazvy}) == len(nazvy)
@@ -0,0 +1,85 @@
+"""testy validace řádků a souboru odmítnutých v opravar_dat"""
+
+import csv
+
+import duckdb
+import pytest
+
+from opravar_dat import OpravarDat, priprav_proudove
+
+ZDROJ = [
+    ["id", "datum", "nazev", "mer"],
+    ["1", "01.05.2025", "jablka", "10"],
+    ["0x10", "01.05.2025 10:00:00", "hrušky", "15,78"],
+    ["٣", "01.05.2025", "švestky", "1"],
+    ["4", "01.05.2025", "meruňky", "999999999999999,9995"],
+    ["5", "01.05.2025", "třešně", "999999999999999,9994"],
+    ["2147483648", "01.05.2025", "višně", "1"],
+    ["7", "32.05.2025", "broskve", "1"],
+    ["8", "01.05.2025", "hrozny"],
+]
+
+
+@pytest.fixture
+def opravar(tmp_path):
+    """opravář nad malým zdrojem s platnými i chybnými řádky"""
+    zdroj = tmp_path / "zdroj.txt"
+    with open(zdroj, "w", encoding="utf-8", newline="") as soubor:
+        csv.writer(soubor, delimiter=";", lineterminator="\n").writerows(ZDROJ)
+    opravar_dat = OpravarDat()
+    opravar_dat.vstup = str(zdroj)
+    opravar_dat.validace = True
+    opravar_dat.odmitnute = str(tmp_path / "odmitnute.csv")
+    priprav_proudove(opravar_dat)
+    return opravar_dat
+
+
+def test_odmitnute_radky(opravar, tmp_path):
+    vystup = tmp_path / "tmp.csv"
+    opravar.uloz_data_proudove(str(vystup), opravar.opravene_radky(), ";", '"')
+
+    with open(opravar.odmitnute, encoding="utf-8") as soubor:
+        odmitnute = list(csv.reader(soubor, delimiter=";"))
+    assert odmitnute[0] == ["zaznam", "duvod", "id", "datum", "nazev", "mer"]
+    assert [radek[0] for radek in odmitnute[1:]] == ["3", "4", "6", "7", "8"]
+    assert [radek[2:] for radek in odmitnute[1:]] == [ZDROJ[i] for i in (3, 4, 6, 7, 8)]
+    assert opravar.pocet_odmitnutych == 5
+    assert opravar.pocet_radku == len(ZDROJ) - 1
+
+    # přijaté řádky duckdb převede na typy z hlavičky bez chyby
+    con = duckdb.connect()
+    con.execute(opravar.prikaz_create)
+    con.execute(f"copy t from '{vystup}' (delimiter ';', header true)")
+    assert con.execute("select id, mer::varchar from t order by id").fetchall() == [
+        (1, "10.000"),
+        (5, "999999999999999.999"),
+        (16, "15.780"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "typ, hodnoty",
+    [
+        (
+            "integer",
+            ["1_000", "_1", "1_", "1__0", "0x_1", "0x1_0", "1_e3", "+_1", "1_.5"],
+        ),
+        ("decimal(18, 3)", ["1_000", "_1", "1_", "1__0", "1.0_5", "1.5_", "1._5"]),
+        (
+            "time",
+            ["1000", "10:00", "9:5", "10:00:00.5", "24:00", "24:30", "10:60"],
+        ),
+        ("time", ["10:00:60", "1000.5", "10.00", "100:00:00", "-10:00"]),
+        ("time", [" 10:00", "10:00 ", "10:00:00 ", "\t10:00:00.5 "]),
+    ],
+)
+def test_kontroly_shodne_s_duckdb(typ, hodnoty):
+    opravar_dat = OpravarDat()
+    opravar_dat.sloupce_a_typy = [["a", typ]]
+    opravar_dat.priprav_kontroly()
+    [(_, _, kontrola)] = opravar_dat.kontroly
+    for hodnota in hodnoty:
+        prevede = duckdb.execute(
+            f"select try_cast(? as {typ}) is not null", [hodnota]
+        ).fetchone()[0]
+        assert kontrola(hodnota) == prevede, hodnota
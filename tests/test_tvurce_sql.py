@@ -0,0 +1,51 @@
+"""testy odhadu datových typů v tvurce_sql"""
+
+from tvurce_sql import TvurceSQL
+
+
+def typy_python(vstup, vzorek):
+    tvurce_sql = TvurceSQL()
+    tvurce_sql.vstup = str(vstup)
+    tvurce_sql.vzorek = vzorek
+    tvurce_sql.nacti_data()
+    tvurce_sql.rozdel_data()
+    tvurce_sql.zjisti_typy_sloupcu()
+    tvurce_sql.vytvor_statistiku_datovych_typu()
+    return tvurce_sql.deklarace
+
+
+def typy_duckdb(vstup, vzorek):
+    tvurce_sql = TvurceSQL()
+    tvurce_sql.vstup = str(vstup)
+    tvurce_sql.vzorek = vzorek
+    tvurce_sql.zjisti_typy_duckdb()
+    return tvurce_sql.deklarace
+
+
+def test_duckdb_shodne_s_pythonem_na_testovacich_datech():
+    vstup = TvurceSQL().vstup
+    assert typy_duckdb(vstup, 1000) == typy_python(vstup, 1000)
+    assert typy_duckdb(vstup, 1000) == [
+        "integer",
+        "timestamp",
+        "varchar",
+        "decimal(18, 3)",
+    ]
+
+
+def test_duckdb_smisene_hodnoty(tmp_path):
+    vstup = tmp_path / "zdroj.txt"
+    radky = ["id;datum;mer;nazev;velke"]
+    for i in range(200):
+        datum = "01.05.2025" if i % 3 else "01.05.2025 10:00:00"
+        mer = f"{i},5" if i % 2 else f"{i}.25"
+        radky.append(f"{i};{datum};{mer};x{i};{i * 10**10}")
+    vstup.write_text("\n".join(radky) + "\n", encoding="utf8")
+    assert typy_duckdb(vstup, 1000) == [
+        "integer",
+        "date",
+        "decimal(18, 3)",
+        "varchar",
+        "bigint",
+    ]
+    assert typy_duckdb(vstup, 1000)[:4] == typy_python(vstup, 1000)[:4]
@@ -0,0 +1,37 @@
+"""testy rozdělení souboru na úseky v useky_souboru"""
+
+import csv
+import io
+
+import pytest
+
+from useky_souboru import precti_usek, rozdel_soubor_na_useky
+
+
+def zaznamy(text):
+    return list(csv.reader(io.StringIO(text, newline=""), delimiter=";"))
+
+
+@pytest.mark.parametrize("velikost_useku", [1, 7, 100, 10**6])
+def test_useky_nerozdeli_hodnotu_v_uvozovkach(tmp_path, velikost_useku):
+    zdroj = tmp_path / "zdroj.txt"
+    radky = ['"id";"pozn\n"'] + [
+        f'{i};"řádek\n{i},5\n;x"' if i % 3 == 0 else f"{i};{i},5" for i in range(50)
+    ]
+    zdroj.write_bytes(("\n".join(radky) + "\n").encode("utf8"))
+
+    useky = rozdel_soubor_na_useky(str(zdroj), velikost_useku, '"')
+    assert useky[-1][1] == zdroj.stat().st_size
+    assert all(konec == dalsi for (_, konec), (dalsi, _) in zip(useky, useky[1:]))
+    casti = [zaznamy(precti_usek(str(zdroj), *usek)) for usek in useky]
+    assert [zaznam for cast in casti for zaznam in cast] == zaznamy(
+        zdroj.read_text(encoding="utf8")
+    )[1:]
+
+
+def test_prazdny_soubor_a_jen_hlavicka(tmp_path):
+    zdroj = tmp_path / "zdroj.txt"
+    zdroj.write_bytes(b"")
+    assert rozdel_soubor_na_useky(str(zdroj), 10) == []
+    zdroj.write_bytes(b"id;nazev\n")
+    assert rozdel_soubor_na_useky(str(zdroj), 10) == []
@@ -0,0 +1,107 @@
+"""testy výběru a exportu dat ve vyberci_dat"""
+
+import os
+
+import duckdb
+import pytest
+
+from vyberci_dat import VyberciDat
+
+RADKY = 100000
+
+
+@pytest.fixture
+def vyberci():
+    """výběrčí nad databází v paměti se 100000 řádky"""
+    vyberci_dat = VyberciDat()
+    vyberci_dat.cache = False
+    vyberci_dat.agregace = {}
+    vyberci_dat.velikost_davky = 10000
+    vyberci_dat.con = duckdb.connect()
+    vyberci_dat.con.execute(
+        f"create table t as select range as id, range % 7 as skupina "
+        f"from range({RADKY})"
+    )
+    yield vyberci_dat
+    vyberci_dat.con.close()
+
+
+@pytest.mark.parametrize(
+    "dotaz, ocekavano",
+    [
+        ("select * from t where id % 3 = 0", 33334),
+        ("select * from t where id % 7 = 0 union all select * from t", 114286),
+        ("select * from t where id < 0", 0),
+    ],
+)
+def test_po_castech_vrati_vsechny_radky(vyberci, dotaz, ocekavano):
+    casti = list(vyberci.vyber_data_po_castech(dotaz))
+    assert sum(len(df) for df in casti) == ocekavano
+    assert all(len(df) <= vyberci.velikost_davky for df in casti)
+    assert list(casti[0].columns) == ["id", "skupina"]
+
+
+def test_export_filtrovaneho_dotazu_do_csv(vyberci, tmp_path):
+    vystup = tmp_path / "vysledek.csv"
+    vyberci.uloz_data_do_csv("select * from t where id % 3 = 0", vystup)
+    with open(vystup, encoding="utf-8") as soubor:
+        radky = soubor.read().splitlines()
+    assert radky[0] == "id;skupina"
+    assert len(radky) - 1 == 33334
+
+
+def test_soubezna_cache_s_uklidem(vyberci, tmp_path):
+    # nulová velikost cache, úklid po každém zápisu smaže
+    # soubory, které jiná vlákna právě hledají nebo zapisují
+    vyberci.cache = True
+    vyberci.slozka_cache = str(tmp_path / "cache")
+    vyberci.velikost_cache = 0
+    vyberci.soubezne_dotazy = 4
+    dotazy = {f"d{i}": f"select * from t where id % {i % 3 + 2} = 0" for i in range(24)}
+    vysledky = vyberci.spust_dotazy(
+        dotazy,
+        lambda kopie, _, dotaz: sum(
+            len(df) for df in kopie.vyber_data_po_castech(dotaz)
+        ),
+    )
+    for nazev, pocet, _ in vysledky:
+        i = int(nazev[1:])
+        assert pocet == len(range(0, RADKY, i % 3 + 2))
+    assert not [
+        nazev for nazev in os.listdir(vyberci.slozka_cache) if nazev.endswith(".tmp")
+    ]
+
+
+def listy_sesitu(cesta):
+    import openpyxl
+
+    sesit = openpyxl.load_workbook(cesta)
+    return {
+        list_xlsx.title: list(list_xlsx.iter_rows(values_only=True))
+        for list_xlsx in sesit
+    }
+
+
+def test_soubezny_export_do_xlsx(vyberci, tmp_path):
+    dotazy = {
+        "deleno3": "select * from t where id % 3 = 0",
+        "skupiny": "select skupina, count(*) as pocet from t group by 1 order by 1",
+        "prazdny": "select * from t where id < 0",
+    }
+    vyberci.format_exportu = "xlsx"
+    vyberci.vystup = str(tmp_path / "postupne.xlsx")
+    casy = vyberci.zpracuj_davku(dotazy)
+    assert list(casy) == list(dotazy)
+
+    vyberci.soubezne_dotazy = 2
+    vyberci.vystup = str(tmp_path / "soubezne.xlsx")
+    casy = vyberci.zpracuj_davku(dotazy)
+    assert sorted(casy) == sorted(dotazy)
+    assert listy_sesitu(tmp_path / "soubezne.xlsx") == listy_sesitu(
+        tmp_path / "postupne.xlsx"
+    )
+
+    # chyba dotazu se předá dál a ostatní vlákna skončí
+    dotazy["skupiny"] = "select * from neexistuje"
+    with pytest.raises(duckdb.CatalogException):
+        vyberci.zpracuj_davku(dotazy)
@@ -4,25 +4,38 @@ typů jednotlivých sloupců. Obsahuje třídy
 pro načítání konfigurace, zpracování dat
 a generování výstupů."""
 
+import io
 import logging
 import csv
 import os
-import importlib.util
+from concurrent.futures import ProcessPoolExecutor
 from decimal import Decimal, InvalidOperation
 from typing import Any
 from datetime import datetime
 from collections import Counter
 
 from uprava_nazvu import zjisti_nazvy_sloupcu
-from master_config import SLOZKA
+from komprese import otevri_zdroj, zjisti_kompresi, komprese_duckdb
+from useky_souboru import rozdel_soubor_na_useky, precti_usek
+from prevod_datumu import PrevodnikDatumu
+from nastaveni import SLOZKA, config
+from metriky import instrumentuj, zaznamenej_radky
 
-# vytvoř absolutní cestu k modulu config.py
-cesta_k_modulu = os.path.join(os.path.dirname(__file__), SLOZKA, "config.py")
-
-# vytvoř import spec
-spec = importlib.util.spec_from_file_location("config", cesta_k_modulu)
-config = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(config)
+# převod datových typů zjištěných duckdb sniff_csv na typy hlavičky
+TYPY_DUCKDB = {
+    "TINYINT": "integer",
+    "SMALLINT": "integer",
+    "INTEGER": "integer",
+    "BIGINT": "bigint",
+    "HUGEINT": "hugeint",
+    "FLOAT": "decimal(18, 3)",
+    "DOUBLE": "decimal(18, 3)",
+    "DATE": "date",
+    "TIME": "time",
+    "TIMESTAMP": "timestamp",
+    "TIMESTAMP WITH TIME ZONE": "timestamp",
+    "BOOLEAN": "boolean",
+}
 
 
 class TvurceSQL:
@@ -32,68 +45,115 @@ class TvurceSQL:
     def __init__(self):
         self.cesta = os.path.dirname(__file__)
         self.vstup = os.path.join(self.cesta, SLOZKA, config.ZDROJ)
+        self.komprese = zjisti_kompresi(self.vstup)  # gzip, zstd, zip nebo None
         self.oddelovac = config.ODDELOVAC
         self.tabulka = config.TABULKA
         self.uvozovky = None if config.UVOZOVKY == "None" else config.UVOZOVKY
         self.data = []
         self.hlavicka = []
         self.data_nazvy = []
+        # přepsání upravených názvů sloupců (viz uprava_nazvu)
+        self.prejmenovani = getattr(config, "PREJMENOVANI_SLOUPCU", None)
         self.vystup = os.path.join(self.cesta, SLOZKA, config.HLAVICKA)
-        self.typy = []
+        self.citace = []  # četnosti datových typů pro každý sloupec
         self.deklarace = []  # obsahuje výsledné datové typy sloupců
+        # počet načtených řádků pro odhad typů a paralelní zpracování
+        self.vzorek = getattr(config, "VZOREK", 1000)
+        # komprimovaný soubor nelze rozdělit na bajtové úseky,
+        # typy se pak zjistí ze vzorku
+        self.paralelne = (
+            getattr(config, "PARALELNI_INFERENCE", False) and not self.komprese
+        )
+        self.pocet_procesu = getattr(config, "POCET_PROCESU", None)
+        self.prevodnik = PrevodnikDatumu(
+            velikost_cache=getattr(config, "VELIKOST_CACHE_DATUMU", 100000)
+        )
+        # odhad typů v pythonu ("python") nebo v duckdb ("duckdb")
+        self.inference = getattr(config, "INFERENCE", "python")
+        self.format_datumu = getattr(config, "FORMAT_DATUMU", "%d.%m.%Y")
+        self.format_casu = getattr(config, "FORMAT_CASU", "%d.%m.%Y %H:%M:%S")
+        self.desetinny_oddelovac = getattr(config, "DESETINNY_ODDELOVAC", ",")
 
     def nacti_data(self):
         """Načte obsah datového souboru a uloží jej do atributu content"""
         try:
             logging.info("Otevírám soubor %s", self.vstup)
-            with open(self.vstup, "r+", newline="", encoding="utf8") as soubor:
+            with otevri_zdroj(self.vstup) as soubor:
                 a = 0
                 cteni = csv.reader(
                     soubor, delimiter=self.oddelovac, quotechar=self.uvozovky
                 )
                 for row in cteni:
                     self.data.append(row)
-                    if a == 1000:
+                    if a == self.vzorek:
                         break
                     a += 1
                 soubor.close()
+                zaznamenej_radky(self, len(self.data))
                 logging.info("Načtení dat dokončeno")
         except IOError:
             logging.info("Soubor s daty neexistuje")
 
+    def nacti_hlavicku(self):
+        """načte pouze hlavičku datového souboru"""
+        try:
+            with otevri_zdroj(self.vstup) as soubor:
+                cteni = csv.reader(
+                    soubor, delimiter=self.oddelovac, quotechar=self.uvozovky
+                )
+                self.hlavicka = next(cteni)
+        except IOError:
+            logging.info("Soubor s daty neexistuje")
+
+    def rozdel_soubor_na_useky(self):
+        """rozdělí soubor (bez hlavičky) na bajtové úseky, jeden
+        na proces, které končí na hranici řádku mimo text v uvozovkách"""
+        pocet = self.pocet_procesu or os.cpu_count() or 1
+        return rozdel_soubor_na_useky(
+            self.vstup, os.path.getsize(self.vstup) // pocet, self.uvozovky
+        )
+
+    def zjisti_typy_useku(self, zacatek: int, konec: int) -> list[Counter]:
+        """projde řádky v bajtovém úseku souboru a vrátí
+        četnosti datových typů pro každý sloupec"""
+        citace = []
+        cteni = csv.reader(
+            io.StringIO(precti_usek(self.vstup, zacatek, konec), newline=""),
+            delimiter=self.oddelovac,
+            quotechar=self.uvozovky,
+        )
+        for row in cteni:
+            for j, hodnota in enumerate(row):
+                if j == len(citace):
+                    citace.append(Counter())
+                citace[j][self.zjisti_typ_hodnoty(hodnota, j)] += 1
+        return citace
+
+    def zjisti_typy_paralelne(self):
+        """zjistí četnosti datových typů v celém souboru,
+        úseky souboru zpracuje souběžně v procesech"""
+        useky = self.rozdel_soubor_na_useky()
+        logging.info("Zjišťuji datové typy v %s úsecích", len(useky))
+        self.citace = []
+        with ProcessPoolExecutor(max_workers=self.pocet_procesu) as pool:
+            vysledky = pool.map(_zjisti_typy_useku, *zip(*useky))
+            for citace in vysledky:
+                for j, citac in enumerate(citace):
+                    if j == len(self.citace):
+                        self.citace.append(Counter())
+                    self.citace[j].update(citac)
+        logging.info("Zjištění datových typů dokončeno")
+
     def rozdel_data(self):
         """rozdělí hlavičku od dat"""
         self.hlavicka = self.data.pop(0)
 
-    def pretypuj_datum(self, date_str: str) -> datetime:
+    def pretypuj_datum(self, date_str: str, sloupec=None) -> datetime:
         """pokusí se převést textový řetězec na datetime
-        pomocí známých formátů"""
-        formats = [
-            "%d.%m.%Y %H:%M:%S",  # 30.06.2025 14:30:00
-            "%d.%m.%Y %H:%M",  # 30.06.2025 14:30
-            "%d.%m.%Y",  # 30.06.2025
-            "%d.%m.%y",  # 30.06.25
-            "%d/%m/%Y %H:%M:%S",  # 30/06/2025 14:30:00
-            "%d/%m/%Y %H:%M",  # 30/06/2025 14:30
-            "%d/%m/%Y",  # 30/06/2025
-            "%Y-%m-%d %H:%M:%S",  # 2025-06-30 14:30:00
-            "%Y-%m-%d %H:%M",  # 2025-06-30 14:30
-            "%Y-%m-%d",  # 2025-06-30
-            "%d %b %Y %H:%M",  # 30 Jun 2025 14:30
-            "%d %B %Y %H:%M",  # 30 June 2025 14:30
-            "%d %b %Y",  # 30 Jun 2025
-            "%d %B %Y",  # 30 June 2025
-        ]
+        pomocí známých formátů (viz prevod_datumu.FORMATY)"""
+        return self.prevodnik.preved(date_str.strip(), sloupec)
 
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str.strip(), fmt)
-            except ValueError:
-                continue
-
-        raise ValueError(f"Nepodařilo se rozpoznat formát data: '{date_str}'")
-
-    def zjisti_typ_hodnoty(self, hodnota: Any) -> str:
+    def zjisti_typ_hodnoty(self, hodnota: Any, sloupec=None) -> str:
         """funkce pro přetypování konkrétn hodnoty"""
         res = ""
         # když je hodnota 0 nebo null, tak ji nebude
@@ -105,14 +165,14 @@ class TvurceSQL:
         elif "." in hodnota and len(hodnota.split(".")) == 3 and not ":" in hodnota:
             # přetypuj na datum
             try:
-                self.pretypuj_datum(hodnota)
+                self.pretypuj_datum(hodnota, sloupec)
                 res = "date"
             except ValueError:
                 res = "varchar"
         elif ":" in hodnota:
             # přetypuj na timestamp protože má hodnota i čas
             try:
-                self.pretypuj_datum(hodnota)
+                self.pretypuj_datum(hodnota, sloupec)
                 res = "timestamp"
             except ValueError:
                 res = "varchar"
@@ -130,51 +190,152 @@ class TvurceSQL:
                 res = "varchar"
         return res
 
+    def zjisti_typy_sloupce(self, hodnoty, sloupec) -> Counter:
+        """vrátí četnosti datových typů hodnot jednoho sloupce,
+        každá různá hodnota se přetypovává jen jednou"""
+        citac = Counter()
+        for hodnota, pocet in Counter(hodnoty).items():
+            citac[self.zjisti_typ_hodnoty(hodnota, sloupec)] += pocet
+        return citac
+
     def zjisti_typy_sloupcu(self):
-        """přetypuj sloupec na duckdb typ"""
+        """přetypuj sloupec na duckdb typ, zpracovává se po
+        sloupcích bez mezivýsledku pro každou buňku"""
 
         if not self.data or not self.data[0]:
             print("Pole je prázdné.")
             return
 
-        radky = len(self.data)
-        sloupce = len(self.data[0])
-
-        # inicializace prázdného pole
-        self.typy = [["" for _ in range(sloupce)] for _ in range(radky)]
-
-        for j in range(sloupce):  # po sloupcích
-            for i in range(radky):  # po řádcích
-                self.typy[i][j] = self.zjisti_typ_hodnoty(self.data[i][j])
+        self.citace = [
+            self.zjisti_typy_sloupce((radek[j] for radek in self.data), j)
+            for j in range(len(self.data[0]))
+        ]
 
     def vytvor_statistiku_datovych_typu(self):
         """vezmi pole s datovými typy a vytvoř
         předpis datového typu pro každý sloupec"""
 
-        # transpozice dat (sloupce místo řádků)
-        columns = list(zip(*self.typy))
-
         # výpis nejčastější hodnoty pro každý sloupec
-        for _, col in enumerate(columns):
-
-            # hodnota s největší četností
-            most_common = Counter(col).most_common(1)[0]
-            res = most_common[0]
-            # když bude v jedné hodnotě číslo decimal, a jinde 0 nebo null,
-            # tak bude typ decimal
-            if any(x.startswith('decimal') for x in col):
-                res = "decimal(18, 3)"
-            # když je null, musí se ověřit, zda je některá hodnota varchar
-            elif res == "null":
-                if any(x.startswith('varchar') for x in col):
-                    res = "varchar"
-                else:
-                    # až když není výskyt varchar, bude hodnota integer,
-                    res = "integer"
-            # jinak bude typ s největší četností
+        for col in self.citace:
+            self.deklarace.append(self.vyber_typ_sloupce(col))
+
+    def vyber_typ_sloupce(self, col: Counter) -> str:
+        """vybere datový typ sloupce podle četností typů hodnot"""
+        # hodnota s největší četností
+        most_common = col.most_common(1)[0]
+        res = most_common[0]
+        # když bude v jedné hodnotě číslo decimal, a jinde 0 nebo null,
+        # tak bude typ decimal
+        if any(x.startswith('decimal') for x in col):
+            res = "decimal(18, 3)"
+        # když je null, musí se ověřit, zda je některá hodnota varchar
+        elif res == "null":
+            if any(x.startswith('varchar') for x in col):
+                res = "varchar"
             else:
-                pass
-            self.deklarace.append(res)
+                # až když není výskyt varchar, bude hodnota integer,
+                res = "integer"
+        # jinak bude typ s největší četností
+        else:
+            pass
+        return res
+
+    def zjisti_typy_duckdb(self):
+        """zjistí datové typy sloupců pomocí duckdb sniff_csv,
+        vzorek (VZOREK, -1 je celý soubor) se čte v duckdb
+        a přetypování probíhá mimo python"""
+        import duckdb
+
+        logging.info("Zjišťuji datové typy v duckdb")
+        with duckdb.connect() as pripojeni:
+            sloupce = pripojeni.execute(
+                """select Columns from sniff_csv(
+                    ?, sample_size = ?, delim = ?, quote = ?, header = true,
+                    decimal_separator = ?, dateformat = ?, timestampformat = ?,
+                    compression = ?
+                )""",
+                [
+                    self.vstup,
+                    self.vzorek,
+                    self.oddelovac,
+                    self.uvozovky or "",
+                    self.desetinny_oddelovac,
+                    self.format_datumu,
+                    self.format_casu,
+                    komprese_duckdb(self.vstup),
+                ],
+            ).fetchone()[0]
+            typy = []
+            for sloupec in sloupce:
+                typ = sloupec["type"]
+                if typ.startswith("DECIMAL"):
+                    typ = "DOUBLE"
+                typy.append(TYPY_DUCKDB.get(typ, "varchar"))
+            if "varchar" in typy or "bigint" in typy:
+                self.nacti_vzorek_duckdb(pripojeni)
+                for j, sloupec in enumerate(sloupce):
+                    nazev = '"' + sloupec["name"].replace('"', '""') + '"'
+                    if typy[j] == "varchar":
+                        typy[j] = self.vyber_typ_sloupce(
+                            self.zjisti_typy_sloupce_duckdb(pripojeni, nazev)
+                        )
+                    elif typy[j] == "bigint":
+                        typy[j] = self.zuz_cele_cislo_duckdb(pripojeni, nazev)
+        self.deklarace.extend(typy)
+        logging.info("Zjištění datových typů dokončeno")
+
+    def nacti_vzorek_duckdb(self, pripojeni):
+        """načte vzorek souboru jako text do dočasné tabulky vzorek"""
+        omezeni = f" limit {int(self.vzorek)}" if self.vzorek != -1 else ""
+        pripojeni.execute(
+            f"""create temp table vzorek as select * from read_csv(
+                ?, delim = ?, quote = ?, header = true, all_varchar = true,
+                compression = ?
+            ){omezeni}""",
+            [
+                self.vstup,
+                self.oddelovac,
+                self.uvozovky or "",
+                komprese_duckdb(self.vstup),
+            ],
+        )
+
+    def zjisti_typy_sloupce_duckdb(self, pripojeni, nazev) -> Counter:
+        """vrátí četnosti datových typů hodnot sloupce vzorku,
+        který sniff_csv označil jako varchar (např. datumy s časem
+        i bez něj nebo desetinná tečka i čárka), hodnoty se třídí
+        stejně jako ve zjisti_typ_hodnoty"""
+        return Counter(
+            dict(
+                pripojeni.execute(
+                    f"""select case
+                        when h is null or h = '0' then 'null'
+                        when h like '%.%' and len(string_split(h, '.')) = 3
+                            and h not like '%:%' then
+                            if(try_strptime(trim(h), ?) is null, 'varchar', 'date')
+                        when h like '%:%' then
+                            if(try_strptime(trim(h), ?) is null, 'varchar', 'timestamp')
+                        when h like '%.%' or h like '%,%' then
+                            if(try_cast(replace(h, ',', '.') as double) is null,
+                               'varchar', 'decimal(18, 3)')
+                        when regexp_full_match(trim(h), '[+-]?[0-9]+') then 'integer'
+                        else 'varchar'
+                    end as typ, count(*)
+                    from (select {nazev} as h from vzorek)
+                    group by typ""",
+                    [self.format_datumu, self.format_casu],
+                ).fetchall()
+            )
+        )
+
+    def zuz_cele_cislo_duckdb(self, pripojeni, nazev) -> str:
+        """sniff_csv označí celá čísla jako bigint, sloupec je
+        integer, pokud se hodnoty vzorku do integer vejdou"""
+        vejde_se = pripojeni.execute(
+            f"select bool_and(try_cast({nazev} as integer) is not null "
+            f"or {nazev} is null) from vzorek"
+        ).fetchone()[0]
+        return "integer" if vejde_se is not False else "bigint"
 
     def uloz_data(self):
         """Uloží hlavičku do textového souboru."""
@@ -194,6 +355,19 @@ class TvurceSQL:
             logging.info("I/O error(%s): %s", e.errno, e.strerror)
 
 
+instrumentuj(
+    TvurceSQL,
+    config,
+    os.path.join(os.path.dirname(__file__), SLOZKA),
+    vynechat=("zjisti_typ_hodnoty", "pretypuj_datum"),
+)
+
+
+def _zjisti_typy_useku(zacatek: int, konec: int) -> list[Counter]:
+    """zpracování jednoho úseku souboru v samostatném procesu"""
+    return TvurceSQL().zjisti_typy_useku(zacatek, konec)
+
+
 def main():
     """Hlavní funkce skriptu, která inicializuje a spouští procesy."""
     fmt = "%(asctime)s: %(message)s"
@@ -202,10 +376,25 @@ def main():
     logging.info("Spuštění skriptu")
 
     tvurce_sql = TvurceSQL()
-    tvurce_sql.nacti_data()
-    tvurce_sql.rozdel_data()
-    tvurce_sql.data_nazvy = zjisti_nazvy_sloupcu(tvurce_sql.hlavicka)
-    tvurce_sql.zjisti_typy_sloupcu()
+    if tvurce_sql.inference == "duckdb":
+        tvurce_sql.nacti_hlavicku()
+        tvurce_sql.data_nazvy = zjisti_nazvy_sloupcu(
+            tvurce_sql.hlavicka, tvurce_sql.prejmenovani
+        )
+        tvurce_sql.zjisti_typy_duckdb()
+    elif tvurce_sql.paralelne:
+        tvurce_sql.nacti_hlavicku()
+        tvurce_sql.data_nazvy = zjisti_nazvy_sloupcu(
+            tvurce_sql.hlavicka, tvurce_sql.prejmenovani
+        )
+        tvurce_sql.zjisti_typy_paralelne()
+    else:
+        tvurce_sql.nacti_data()
+        tvurce_sql.rozdel_data()
+        tvurce_sql.data_nazvy = zjisti_nazvy_sloupcu(
+            tvurce_sql.hlavicka, tvurce_sql.prejmenovani
+        )
+        tvurce_sql.zjisti_typy_sloupcu()
     tvurce_sql.vytvor_statistiku_datovych_typu()
     tvurce_sql.uloz_data()
 
@@ -3,35 +3,74 @@
 """modul pro úpravu názvů"""
 
 import re
+import functools
 
+# diakritika (malá i velká písmena) a znaky, které se z názvu odstraní
+PREKLAD = str.maketrans(
+    "áčďéěíňóřšťúůýžÁČĎÉĚÍŇÓŘŠŤÚŮÝŽ",
+    "acdeeinorstuuyzACDEEINORSTUUYZ",
+    " .-",
+)
+# jednotky v závorkách se odstraní celé, ostatní závorky a lomítka jen jako znaky
+ODSTRANIT = re.compile(r"\(kc\)|\(h\)|[()/\\\[\]]")
+# výchozí přejmenování názvů, které dělaly problémy při importu
+KRITICKE = {"index": "ix", "key2": "neco"}
 
-def zjisti_nazvy_sloupcu(data):
-    """upraví názvy sloupců v hlavičce souboru."""
+
+@functools.cache
+def rezervovana_slova():
+    """vrátí rezervovaná klíčová slova duckdb, která nelze
+    použít jako název sloupce bez uvozovek"""
+    import duckdb
+
+    return frozenset(
+        nazev
+        for (nazev,) in duckdb.sql(
+            "select keyword_name from duckdb_keywords() "
+            "where keyword_category = 'reserved'"
+        ).fetchall()
+    )
+
+
+@functools.lru_cache(maxsize=4096)
+def uprav_nazev(nazev: str) -> str:
+    """upraví jeden název sloupce (malá písmena bez diakritiky,
+    mezer, teček, pomlček, závorek a lomítek)"""
+    return ODSTRANIT.sub("", nazev.lower().translate(PREKLAD))
+
+
+@functools.lru_cache(maxsize=1024)
+def _uprav_hlavicku(hlavicka: tuple, prejmenovani: tuple) -> tuple:
+    """upraví celou hlavičku, výsledek se pamatuje, takže se
+    stejná hlavička v dávce souborů upravuje jen jednou"""
+    kriticke = dict(KRITICKE, **dict(prejmenovani))
+    rezervovana = rezervovana_slova()
     upravene = []
-    kriticke = {"index": "ix", "key2": "neco"}
-    for i in data:
-        novy = i.lower()
-        novy = re.sub(
-            r"[áéíýóůúěščřž]",
-            lambda x: x.group(0).translate(
-                str.maketrans("áéíýóůúěščřž", "aeiyouuescrz")
-            ),
-            novy,
-        )
-        novy = (
-            novy.replace(" ", "")
-            .replace(".", "")
-            .replace("-", "")
-            .replace("(kc)", "")
-            .replace("(h)", "")
-            .replace("(", "")
-            .replace(")", "")
-            .replace("/", "")
-            .replace("\\", "")
-            .replace("[", "")
-            .replace("]", "")
-        )
+    pouzite = set()
+    for poradi, nazev in enumerate(hlavicka, start=1):
+        novy = uprav_nazev(nazev) or f"sloupec{poradi}"
         if novy in kriticke:
-            novy = kriticke.get(novy)
+            novy = kriticke[novy]
+        elif novy in rezervovana:
+            novy = f"{novy}_"
+        # stejné názvy se rozliší pořadovým číslem
+        zaklad, pocet = novy, 1
+        while novy in pouzite:
+            pocet += 1
+            novy = f"{zaklad}_{pocet}"
+        pouzite.add(novy)
         upravene.append(novy)
-    return upravene
+    return tuple(upravene)
+
+
+def zjisti_nazvy_sloupcu(data, prejmenovani=None):
+    """upraví názvy sloupců v hlavičce souboru.
+
+    Args:
+        data: původní názvy sloupců
+        prejmenovani: slovník přejmenování upravených názvů
+            (doplňuje a přepisuje KRITICKE), např. z config.py
+    """
+    return list(
+        _uprav_hlavicku(tuple(data), tuple(sorted((prejmenovani or {}).items())))
+    )
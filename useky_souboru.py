@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""modul pro rozdělení nekomprimovaného csv souboru na bajtové úseky.
+
+Úseky začínají i končí na hranici záznamu, konec řádku uvnitř
+hodnoty v uvozovkách záznam nerozdělí. Úseky pak mohou souběžně
+zpracovat procesy (paralelní oprava dat a odhad datových typů).
+"""
+
+import os
+import mmap
+
+
+def delka_hlavicky(cesta: str, uvozovky: bytes = None) -> int:
+    """vrátí počet bajtů hlavičky včetně konce řádku"""
+    with open(cesta, "rb") as soubor:
+        hlavicka = soubor.readline()
+        while uvozovky and hlavicka.count(uvozovky) % 2:
+            radek = soubor.readline()
+            if not radek:
+                break
+            hlavicka += radek
+    return len(hlavicka)
+
+
+def rozdel_soubor_na_useky(cesta: str, velikost_useku: int, uvozovky: str = None):
+    """rozdělí soubor (bez hlavičky) na bajtové úseky o velikosti
+    alespoň velikost_useku, vrátí seznam dvojic (začátek, konec)"""
+    uvozovky = uvozovky.encode("utf8") if uvozovky else None
+    if os.path.getsize(cesta) == 0:
+        return []
+    velikost_useku = max(velikost_useku, 1)
+    with open(cesta, "rb") as soubor, mmap.mmap(
+        soubor.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        velikost = len(data)
+        # první úsek začíná až za hlavičkou
+        hranice = [delka_hlavicky(cesta, uvozovky)]
+        while hranice[-1] < velikost:
+            konec = data.find(b"\n", hranice[-1] + velikost_useku)
+            # lichý počet uvozovek znamená konec řádku uvnitř hodnoty
+            pocet = data[hranice[-1] : konec].count(uvozovky) if uvozovky else 0
+            while konec != -1 and pocet % 2:
+                dalsi = data.find(b"\n", konec + 1)
+                pocet += data[konec:dalsi].count(uvozovky)
+                konec = dalsi
+            hranice.append(velikost if konec == -1 else konec + 1)
+    return list(zip(hranice[:-1], hranice[1:]))
+
+
+def precti_usek(cesta: str, zacatek: int, konec: int) -> str:
+    """vrátí text bajtového úseku souboru"""
+    with open(cesta, "rb") as soubor, mmap.mmap(
+        soubor.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        return data[zacatek:konec].decode("utf8")
@@ -7,21 +7,71 @@ zobrazení výsledků a export dat do souborů.
 
 import logging
 import os
+import re
+import copy
+import json
+import time
+import queue
 import shutil
-import importlib.util
+import hashlib
+import functools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import duckdb
-import pandas
-from openpyxl import load_workbook
 
-from master_config import SLOZKA
+from agregace import prepis_dotaz
+from nastaveni import SLOZKA, config
+from metriky import instrumentuj, zaznamenej_radky
 
-# vytvoř absolutní cestu k modulu config.py
-cesta_k_modulu = os.path.join(os.path.dirname(__file__), SLOZKA, "config.py")
+# cache výsledků sdílí všechna vlákna souběžně prováděných dotazů
+_ZAMEK_CACHE = threading.Lock()
+# počet částí výsledku, které čekají na zápis do excelu (na dotaz)
+CEKAJICI_CASTI = 2
 
-# vytvoř import spec
-spec = importlib.util.spec_from_file_location("config", cesta_k_modulu)
-config = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(config)
+
+def _vloz_do_fronty(fronta, polozka, zrusit) -> bool:
+    """vloží položku do omezené fronty, čeká na volné místo,
+    dokud není zpracování zrušeno (pak vrátí False)"""
+    while not zrusit.is_set():
+        try:
+            fronta.put(polozka, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _casti_z_fronty(fronta):
+    """vrací části výsledku z fronty až po značku konce None"""
+    while True:
+        df = fronta.get()
+        if df is None:
+            return
+        yield df
+
+
+@functools.cache
+def nastav_pandas():
+    """načte knihovnu pandas až při prvním výběru dat
+    a nastaví ji pro zobrazení dat"""
+    import pandas
+
+    pandas.set_option("display.max_columns", 3000)
+    pandas.set_option("display.max_rows", 500)
+    pandas.set_option("display.expand_frame_repr", False)
+    pandas.set_option("max_colwidth", 3000)
+    pandas.set_option("display.width", 3000)
+    pandas.options.display.float_format = "{:20,.2f}".format
+
+
+def normalizuj_dotaz(dotaz):
+    """sjednotí bílé znaky dotazu mimo textové řetězce
+    a odstraní koncový středník"""
+    casti = re.split(r"('(?:[^']|'')*')", dotaz)
+    for i in range(0, len(casti), 2):
+        casti[i] = re.sub(r"\s+", " ", casti[i])
+    return "".join(casti).strip().rstrip(";").strip()
 
 
 class VyberciDat:
@@ -34,30 +84,152 @@ class VyberciDat:
         self.cur = None  # Kurzory pro SQL dotazy
         self.sablona = os.path.join(self.cesta, "sablona.xlsx")
         self.vystup = os.path.join(self.cesta, SLOZKA, "result.xlsx")  # Výstupní soubor
-        self.vysledne = pandas.DataFrame()  # Uchování výsledků dotazů
-
-        # Nastavení knihovny pandas pro zobrazení dat
-        pandas.set_option("display.max_columns", 3000)
-        pandas.set_option("display.max_rows", 500)
-        pandas.set_option("display.expand_frame_repr", False)
-        pandas.set_option("max_colwidth", 3000)
-        pandas.set_option("display.width", 3000)
-        pandas.options.display.float_format = "{:20,.2f}".format
-
-    def pripoj_se_k_databazi(self):
-        """připojí se k databázi"""
+        self.vysledne = None  # Uchování výsledků dotazů
+        # Cache výsledků dotazů (parquet), zneplatní se novým importem
+        self.cache = getattr(config, "CACHE_DOTAZU", False)
+        self.slozka_cache = os.path.join(self.cesta, SLOZKA, "cache")
+        self.velikost_cache = getattr(config, "VELIKOST_CACHE_MB", 512) * 1024**2
+        # Formát exportu: "xlsx", "parquet" nebo "arrow"
+        self.format_exportu = getattr(config, "FORMAT_EXPORTU", "xlsx")
+        self.rozdelit_podle = getattr(config, "ROZDELIT_PODLE", None)
+        self.velikost_davky = getattr(config, "VELIKOST_DAVKY", 100000)
+        # Agregační tabulky, ze kterých se počítají odpovídající dotazy
+        self.agregace = getattr(config, "AGREGACE", None) or {}
+        # Počet dotazů prováděných souběžně na kurzorech jednoho připojení
+        self.soubezne_dotazy = getattr(config, "SOUBEZNE_DOTAZY", 1)
+
+    def pripoj_se_k_databazi(self, jen_pro_cteni=False):
+        """připojí se k databázi, pro samotné dotazy
+        stačí připojení jen pro čtení"""
         if os.path.isfile(self.db):
-            self.con = duckdb.connect(self.db)
+            self.con = duckdb.connect(self.db, read_only=jen_pro_cteni)
         else:
             logging.info("Databáze nenalezena")
 
+    def prepis_dotaz(self, dotaz):
+        """dotaz, který lze spočítat z agregační tabulky,
+        přepíše na tuto tabulku, jinak jej vrátí beze změny"""
+        if not self.agregace:
+            return dotaz
+        prepsany = prepis_dotaz(self.con, dotaz, config.TABULKA, self.agregace)
+        if prepsany is None:
+            return dotaz
+        logging.info("Dotaz se spočítá z agregační tabulky")
+        return prepsany
+
     def vyber_data_z_databaze(self, dotaz):
         """provede SQL dotaz na databázi"""
+        nastav_pandas()
         if self.con:
-            return self.con.execute(dotaz).fetchdf()
+            dotaz = self.prepis_dotaz(dotaz)
+            if self.cache:
+                df = self.vyber_data_z_cache(dotaz)
+            else:
+                df = self.con.execute(dotaz).fetchdf()
+            zaznamenej_radky(self, len(df))
+            return df
         logging.error("Nelze provést dotaz, připojení k databázi nebylo úspěšné.")
         return None
 
+    def otisk_tabulek(self, dotaz):
+        """vrátí generace načtení tabulek, které dotaz používá,
+        pohledy se rozloží na tabulky, ze kterých čtou"""
+        try:
+            generace = dict(
+                self.con.execute(
+                    "select tabulka, generace from generace_nacteni"
+                ).fetchall()
+            )
+        except duckdb.CatalogException:
+            generace = {}
+        # get_table_names připojení dotaz naváže, takže vrátí
+        # tabulky i pod pohledy
+        otisk = {
+            tabulka: generace.get(tabulka, 0)
+            for tabulka in sorted(self.con.get_table_names(dotaz))
+        }
+        # změna definice pohledu musí také zneplatnit výsledek
+        pohledy = dict(
+            self.con.execute(
+                "select lower(view_name), sql from duckdb_views() "
+                "where not internal order by view_name"
+            ).fetchall()
+        )
+        if any(nazev.lower() in pohledy for nazev in duckdb.get_table_names(dotaz)):
+            otisk["pohledy"] = pohledy
+        return otisk
+
+    def vyber_data_z_cache(self, dotaz):
+        """vrátí výsledek dotazu z cache, pokud v ní není,
+        provede dotaz a výsledek do cache uloží"""
+        klic = json.dumps([normalizuj_dotaz(dotaz), self.otisk_tabulek(dotaz)])
+        soubor = os.path.join(
+            self.slozka_cache, hashlib.sha256(klic.encode("utf8")).hexdigest()
+        )
+        soubor += ".parquet"
+        # soubor může mezi kontrolou a čtením smazat úklid v jiném
+        # vlákně, chybějící soubor je proto jen výsledek mimo cache
+        try:
+            os.utime(soubor)
+            df = self.con.read_parquet(soubor).df()
+            logging.info("Výsledek dotazu načten z cache")
+            return df
+        except (FileNotFoundError, duckdb.IOException):
+            pass
+        df = self.con.execute(dotaz).fetchdf()
+        os.makedirs(self.slozka_cache, exist_ok=True)
+        # zápis do dočasného souboru a přejmenování, jiné vlákno tak
+        # nikdy nepřečte rozepsaný soubor a souběžné zápisy se nepřepíšou
+        docasny = f"{soubor}.{os.getpid()}.{threading.get_ident()}.tmp"
+        self.con.from_df(df).write_parquet(docasny)
+        os.replace(docasny, soubor)
+        self.uklid_cache()
+        return df
+
+    def uklid_cache(self):
+        """smaže nejdéle nepoužité výsledky, dokud cache
+        nepřesahuje nastavenou velikost, rozepsané dočasné
+        soubory ostatních vláken nechá"""
+        with _ZAMEK_CACHE:
+            soubory = sorted(
+                (
+                    os.path.join(self.slozka_cache, nazev)
+                    for nazev in os.listdir(self.slozka_cache)
+                    if nazev.endswith(".parquet")
+                ),
+                key=os.path.getmtime,
+            )
+            celkem = sum(os.path.getsize(soubor) for soubor in soubory)
+            for soubor in soubory:
+                if celkem <= self.velikost_cache:
+                    break
+                celkem -= os.path.getsize(soubor)
+                os.remove(soubor)
+
+    def vyber_data_po_castech(self, dotaz):
+        """provede SQL dotaz a výsledek postupně vrací po částech
+        (dataframe o nejvýše velikost_davky řádcích), první část
+        se vrátí i u prázdného výsledku kvůli názvům sloupců"""
+        if not self.con:
+            logging.error("Nelze provést dotaz, připojení k databázi nebylo úspěšné.")
+            return
+        nastav_pandas()
+        dotaz = self.prepis_dotaz(dotaz)
+        if self.cache:
+            yield self.vyber_data_z_cache(dotaz)
+            return
+        vysledek = self.con.execute(dotaz)
+        # duckdb vrací data po vektorech o 2048 řádcích, u filtrovaných
+        # a paralelních dotazů i kratší část uprostřed výsledku,
+        # konec výsledku pozná až podle prázdné části
+        vektory = max(1, self.velikost_davky // 2048)
+        df = vysledek.fetch_df_chunk(vektory)
+        yield df
+        while not df.empty:
+            df = vysledek.fetch_df_chunk(vektory)
+            if not df.empty:
+                yield df
+
     def odpoj_se_od_databaze(self):
         """potvrdí příkazy a ukončí připojení k databázi"""
         if self.con:
@@ -70,22 +242,240 @@ class VyberciDat:
         """
         shutil.copy2(self.sablona, self.vystup)
 
+    def zapis_do_listu(self, export, nazev, casti):
+        """zapíše části výsledku (dataframy) včetně hlavičky
+        na nový list sešitu, první část se vypíše"""
+        list_xlsx = None
+        for df in casti:
+            if list_xlsx is None:
+                print("\n", df, "\n")
+                list_xlsx = export.pridej_list(nazev)
+                list_xlsx.zapis_radek(df.columns.tolist())
+            list_xlsx.zapis_dataframe(df)
+
     def uloz_data_do_xlsx(self, df):
-        """ulož dataframe do xlsx"""
-        res = [df.columns.tolist()] + df.values.tolist()
+        """ulož dataframe do xlsx, data se zapisují proudově
+        po celých sloupcích do kopie šablony"""
+        from export_xlsx import ExportXlsx
 
-        # Načtení existujícího Excelového souboru
-        book = load_workbook(self.vystup)
-        sheet = book["List1"]
+        export = ExportXlsx(self.sablona, self.vystup)
 
         logging.info("Exportuji do excelu..")
 
-        for row_index, row in enumerate(res, start=1):
-            for col_index, value in enumerate(row, start=1):
-                sheet.cell(row=row_index, column=col_index, value=value)
+        self.zapis_do_listu(export, "List1", [df])
 
         # Uložení změn
-        book.save(self.vystup)
+        export.uloz()
+
+    def ctenar_davek(self, dotaz):
+        """vrátí pyarrow čtenáře, který výsledek dotazu
+        postupně načítá po dávkách"""
+        vysledek = self.con.execute(self.prepis_dotaz(dotaz))
+        if hasattr(vysledek, "to_arrow_reader"):
+            return vysledek.to_arrow_reader(self.velikost_davky)
+        return vysledek.fetch_record_batch(self.velikost_davky)
+
+    def uloz_data_do_parquet(self, dotaz, vystup, rozdelit_podle=None):
+        """uloží výsledek dotazu do parquet přímo příkazem copy,
+        volitelně rozdělený (hive) podle zadaného sloupce do složky"""
+        moznosti = "format parquet, compression zstd"
+        if rozdelit_podle:
+            moznosti += f", partition_by ({rozdelit_podle}), overwrite true"
+        logging.info("Exportuji do parquet %s..", vystup)
+        dotaz = self.prepis_dotaz(dotaz)
+        self.con.execute(f"copy ({dotaz}) to '{vystup}' ({moznosti})")
+
+    def uloz_data_do_arrow(self, dotaz, vystup):
+        """uloží výsledek dotazu do souboru arrow ipc,
+        data se zapisují po dávkách bez převodu na pandas"""
+        import pyarrow
+
+        logging.info("Exportuji do arrow %s..", vystup)
+        ctenar = self.ctenar_davek(dotaz)
+        with pyarrow.ipc.new_file(vystup, ctenar.schema) as zapis:
+            for davka in ctenar:
+                zapis.write_batch(davka)
+
+    def uloz_data_do_csv(self, dotaz, vystup):
+        """uloží výsledek dotazu do csv, části výsledku
+        se zapisují postupně"""
+        logging.info("Exportuji do csv %s..", vystup)
+        with open(vystup, "w", encoding="utf-8", newline="") as soubor:
+            for i, df in enumerate(self.vyber_data_po_castech(dotaz)):
+                df.to_csv(soubor, sep=";", index=False, header=i == 0)
+
+    def exportuj_dotaz(self, nazev, dotaz):
+        """uloží výsledek dotazu do souboru podle formátu exportu"""
+        slozka = os.path.dirname(self.vystup)
+        if self.format_exportu == "parquet":
+            vystup = os.path.join(slozka, nazev)
+            if not self.rozdelit_podle:
+                vystup += ".parquet"
+            self.uloz_data_do_parquet(dotaz, vystup, self.rozdelit_podle)
+        elif self.format_exportu == "arrow":
+            self.uloz_data_do_arrow(dotaz, os.path.join(slozka, f"{nazev}.arrow"))
+        elif self.format_exportu == "csv":
+            self.uloz_data_do_csv(dotaz, os.path.join(slozka, f"{nazev}.csv"))
+        else:
+            raise ValueError(f"Neznámý formát exportu: '{self.format_exportu}'")
+
+    def na_kurzoru(self):
+        """vrátí kopii výběrčího, která dotazy provádí na vlastním
+        kurzoru sdíleného připojení (pro použití v jiném vlákně)"""
+        kopie = copy.copy(self)
+        kopie.con = self.con.cursor()
+        return kopie
+
+    def proved_na_kurzoru(self, funkce, nazev, dotaz):
+        """provede funkci na vlastním kurzoru a vrátí
+        její výsledek a dobu běhu v sekundách"""
+        zacatek = time.perf_counter()
+        vyberci = self.na_kurzoru()
+        try:
+            vysledek = funkce(vyberci, nazev, dotaz)
+        finally:
+            vyberci.con.close()
+        doba = time.perf_counter() - zacatek
+        logging.info("Dotaz %s dokončen za %.3f s", nazev, doba)
+        return vysledek, doba
+
+    def posli_casti(self, dotaz, fronta, zrusit):
+        """vkládá části výsledku dotazu do omezené fronty pro zápis
+        v jiném vlákně, na konci (i po chybě) vloží značku None"""
+        try:
+            for df in self.vyber_data_po_castech(dotaz):
+                if not _vloz_do_fronty(fronta, df, zrusit):
+                    return
+        finally:
+            _vloz_do_fronty(fronta, None, zrusit)
+
+    def spust_dotazy(self, dotazy, funkce):
+        """provede dotazy souběžně ve vláknech, nejvýše soubezne_dotazy
+        najednou, a vrací (název, výsledek, doba) v pořadí zadání,
+        zpracování hotových výsledků se tak překrývá s dalšími dotazy
+
+        Args:
+            dotazy: dict - název -> SQL dotaz
+            funkce: funkce(vyberci, nazev, dotaz) prováděná ve vlákně
+        """
+        with ThreadPoolExecutor(max_workers=self.soubezne_dotazy) as pool:
+            # rozpracovaných dotazů je nejvýše dvojnásobek vláken,
+            # v paměti tak není najednou výsledek všech dotazů
+            cekajici = deque()
+            for nazev, dotaz in dotazy.items():
+                if len(cekajici) >= 2 * self.soubezne_dotazy:
+                    hotovy, budouci = cekajici.popleft()
+                    yield (hotovy, *budouci.result())
+                cekajici.append(
+                    (nazev, pool.submit(self.proved_na_kurzoru, funkce, nazev, dotaz))
+                )
+            while cekajici:
+                hotovy, budouci = cekajici.popleft()
+                yield (hotovy, *budouci.result())
+
+    def zpracuj_davku_soubezne(self, dotazy):
+        """provede dotazy souběžně na kurzorech sdíleného připojení,
+        výsledky se čtou po částech stejně jako při postupném
+        zpracování, do excelu se zapisují v hlavním vlákně souběžně
+        s dalšími dotazy, ostatní formáty se exportují přímo ve vláknech
+
+        Args:
+            dotazy: dict - název listu -> SQL dotaz
+
+        Return:
+            dict - název -> doba běhu dotazu v sekundách
+        """
+        zacatek = time.perf_counter()
+        casy = {}
+        if self.format_exportu != "xlsx":
+            for nazev, _, doba in self.spust_dotazy(
+                dotazy,
+                lambda vyberci, nazev, dotaz: vyberci.exportuj_dotaz(nazev, dotaz),
+            ):
+                casy[nazev] = doba
+        else:
+            self.zapis_do_xlsx_soubezne(dotazy, casy)
+        logging.info(
+            "Dotazů: %s, celkem %.3f s, součet dob dotazů %.3f s",
+            len(casy),
+            time.perf_counter() - zacatek,
+            sum(casy.values()),
+        )
+        return casy
+
+    def zapis_do_xlsx_soubezne(self, dotazy, casy):
+        """zapíše výsledky souběžných dotazů do sešitu v pořadí
+        zadání, části výsledku předává každý dotaz přes omezenou
+        frontu, v paměti je tak nejvýše CEKAJICI_CASTI částí
+        na každé vlákno, doby dotazů zapíše do casy"""
+        from export_xlsx import ExportXlsx
+
+        export = ExportXlsx(self.sablona, self.vystup)
+        zrusit = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.soubezne_dotazy) as pool:
+            # dotazy se spouští v pořadí zadání, dotaz, jehož list se
+            # právě zapisuje, tak nikdy nečeká na volné vlákno
+            fronty = {}
+            budouci = {}
+            for nazev, dotaz in dotazy.items():
+                fronty[nazev] = queue.Queue(maxsize=CEKAJICI_CASTI)
+                budouci[nazev] = pool.submit(
+                    self.proved_na_kurzoru,
+                    lambda vyberci, nazev, dotaz: vyberci.posli_casti(
+                        dotaz, fronty[nazev], zrusit
+                    ),
+                    nazev,
+                    dotaz,
+                )
+            try:
+                for nazev in dotazy:
+                    logging.info("Exportuji do excelu list %s..", nazev)
+                    self.zapis_do_listu(export, nazev, _casti_z_fronty(fronty[nazev]))
+                    _, casy[nazev] = budouci[nazev].result()
+            except BaseException:
+                zrusit.set()
+                for dalsi in budouci.values():
+                    dalsi.cancel()
+                raise
+        export.uloz()
+
+    def zpracuj_davku(self, dotazy):
+        """provede všechny dotazy na jednom připojení, výsledky
+        vypíše a uloží do jednoho sešitu, každý na vlastní list,
+        při nastavení SOUBEZNE_DOTAZY > 1 souběžně na kurzorech
+
+        Args:
+            dotazy: dict - název listu -> SQL dotaz
+
+        Return:
+            dict - název -> doba běhu dotazu v sekundách
+        """
+        if self.soubezne_dotazy > 1:
+            return self.zpracuj_davku_soubezne(dotazy)
+
+        casy = {}
+        if self.format_exportu != "xlsx":
+            for nazev, dotaz in dotazy.items():
+                zacatek = time.perf_counter()
+                self.exportuj_dotaz(nazev, dotaz)
+                casy[nazev] = time.perf_counter() - zacatek
+                logging.info("Dotaz %s dokončen za %.3f s", nazev, casy[nazev])
+            return casy
+
+        from export_xlsx import ExportXlsx
+
+        export = ExportXlsx(self.sablona, self.vystup)
+        for nazev, dotaz in dotazy.items():
+            logging.info("Exportuji do excelu list %s..", nazev)
+            zacatek = time.perf_counter()
+            self.zapis_do_listu(export, nazev, self.vyber_data_po_castech(dotaz))
+            casy[nazev] = time.perf_counter() - zacatek
+            logging.info("Dotaz %s dokončen za %.3f s", nazev, casy[nazev])
+        export.uloz()
+        return casy
+
+
+instrumentuj(VyberciDat, config, os.path.join(os.path.dirname(__file__), SLOZKA))
 
 
 def main():
@@ -118,15 +508,14 @@ def main():
     """
     )
 
-    # Projde seznam dotazů a provede je postupně
-    for i in dotazy:
-        vyberci_dat = VyberciDat()
-        vyberci_dat.pripoj_se_k_databazi()
-        df = vyberci_dat.vyber_data_z_databaze(i)
-        print("\n", df, "\n")
-        vyberci_dat.zkopiruj_xlsx_sablonu()
-        vyberci_dat.uloz_data_do_xlsx(df)
-        vyberci_dat.odpoj_se_od_databaze()
+    # Provede všechny dotazy na jednom připojení, každý
+    # výsledek se uloží na vlastní list výstupního sešitu
+    vyberci_dat = VyberciDat()
+    vyberci_dat.pripoj_se_k_databazi(jen_pro_cteni=True)
+    vyberci_dat.zpracuj_davku(
+        {f"List{i}": dotaz for i, dotaz in enumerate(dotazy, start=1)}
+    )
+    vyberci_dat.odpoj_se_od_databaze()
 
     logging.info("Ukončení skriptu")
 